@@ -1,216 +1,35 @@
 import httpx
-import re
-import secrets
 import logging
 import html
-import asyncio
 from datetime import datetime, timedelta
 from pyrogram import Client, filters
-from pyrogram.types import Message
+from pyrogram.types import Message, CallbackQuery
 from pyrogram.enums import ParseMode
 
 from bot import app
 
 from config import settings
-from bot.services.http_clients import http_client, jellyfin_headers, jellyseerr_headers
+from bot.services.http_clients import jellyfin_client, jellyseerr_client
+from bot.services.jellyfin_users import (
+    get_jellyfin_users,
+    find_jellyfin_user_by_name,
+    invalidate_jellyfin_users,
+)
+from bot.services.jellyseerr_users import find_by_jellyfin_id, forget_user
+from bot.services.provisioning import enqueue_invite
+from bot.services.sessions import create_pagination_session, get_pagination_session
 from bot.services.database import (
-    store_linked_user,
     delete_linked_user,
     get_user_by_username,
+    get_all_linked_users,
 )
+from bot.helpers.markup import create_list_pagination_markup
 
 logger = logging.getLogger(__name__)
 
 ADMIN_USER_IDS = settings.ADMIN_USER_IDS
 
 
-async def _create_user(
-    app_client: Client,
-    reply_message: Message,
-    telegram_user_id: int,
-    telegram_username: str,
-    duration_days: int = None,
-    role_name_to_assign: str = None,
-):
-    jellyfin_url = settings.JELLYFIN_URL
-    jellyseerr_url = settings.JELLYSEERR_URL
-
-    username = re.sub(r"[^a-zA-Z0-9.-]", "", telegram_username)
-    if not username:
-        username = f"tg_user_{telegram_user_id}"
-
-    temp_password = secrets.token_urlsafe(12)
-    jellyfin_user_id = None
-    jellyfin_user_created = False
-
-    try:
-        users_url = f"{jellyfin_url}/Users"
-        users_response = await http_client.get(
-            users_url, headers=jellyfin_headers, timeout=10
-        )
-        users_response.raise_for_status()
-        jellyfin_users = users_response.json()
-
-        existing_user = next(
-            (
-                u
-                for u in jellyfin_users
-                if u.get("Name", "").lower() == username.lower()
-            ),
-            None,
-        )
-
-        if existing_user:
-            await reply_message.edit(
-                f"⚠️ **User Already Exists!**\n"
-                f"User '{html.escape(username)}' (ID: `{existing_user.get('Id')}`) already exists in Jellyfin."
-            )
-            return
-
-    except httpx.HTTPStatusError as e:
-        await reply_message.edit(
-            f"❌ Failed to check for existing users (HTTP {e.response.status_code}): {e.response.text}"
-        )
-        return
-    except httpx.RequestError as e:
-        await reply_message.edit(
-            f"❌ Failed to check for existing users (Network Error): {e}"
-        )
-        return
-
-    # 1. Create Jellyfin User
-    try:
-        jellyfin_user_payload = {
-            "Name": username,
-            "Password": temp_password,
-            "Policy": {
-                "IsAdministrator": False,
-                "EnableUserPreferenceAccess": True,
-                "EnableMediaPlayback": True,
-                "EnableLiveTvAccess": False,
-                "EnableLiveTvManagement": False,
-            },
-        }
-        response_fin = await http_client.post(
-            f"{jellyfin_url}/Users/New",
-            headers=jellyfin_headers,
-            json=jellyfin_user_payload,
-        )
-
-        response_fin.raise_for_status()
-
-        jellyfin_user_id = response_fin.json().get("Id")
-        jellyfin_user_created = True
-
-    except httpx.HTTPStatusError as e:
-        await reply_message.edit(
-            f"❌ Failed to create Jellyfin user (HTTP {e.response.status_code}): {e.response.text}"
-        )
-        return
-    except httpx.RequestError as e:
-        await reply_message.edit(
-            f"❌ Failed to create Jellyfin user (Network Error): {e}"
-        )
-        return
-
-    if not jellyfin_user_id:
-        await reply_message.edit("❌ Failed to get Jellyfin User ID after creation.")
-        return
-
-    # 2. Import User to Jellyseerr
-    jellyseerr_user = None
-    try:
-        response_seerr_import = await http_client.post(
-            f"{jellyseerr_url}/api/v1/user/import-from-jellyfin",
-            headers=jellyseerr_headers,
-            json={"jellyfinUserIds": [jellyfin_user_id]},
-        )
-        response_seerr_import.raise_for_status()
-        jellyseerr_user = response_seerr_import.json()[0]
-
-    except (httpx.HTTPStatusError, httpx.RequestError) as e:
-        logger.warning(
-            f"Failed to auto-import {username} to Jellyseerr: {e}. Trying to find them..."
-        )
-
-        # Wait 2 seconds in case Jellyseerr is just slow to index
-        await asyncio.sleep(2)
-
-        try:
-            seerr_users_url = f"{jellyseerr_url}/api/v1/user?take=1000"
-            seerr_response = await http_client.get(
-                seerr_users_url, headers=jellyseerr_headers
-            )
-            seerr_response.raise_for_status()
-            seerr_users = seerr_response.json().get("results", [])
-
-            jellyseerr_user = next(
-                (
-                    u
-                    for u in seerr_users
-                    if str(u.get("jellyfinUserId")) == str(jellyfin_user_id)
-                ),
-                None,
-            )
-            if not jellyseerr_user:
-                raise Exception("User not found in Jellyseerr after failed import.")
-
-        except (httpx.HTTPStatusError, httpx.RequestError, Exception) as search_e:
-            logger.error(f"Failed to find user in Jellyseerr: {search_e}")
-            # Rollback: Delete the Jellyfin user we just created
-            if jellyfin_user_created:
-                await http_client.delete(
-                    f"{jellyfin_url}/Users/{jellyfin_user_id}", headers=jellyfin_headers
-                )
-            await reply_message.edit(
-                f"❌ Failed to import/find in Jellyseerr ({e}). Rolled back Jellyfin user creation."
-            )
-            return
-
-    if role_name_to_assign:
-        logger.info(f"User {username} assigned virtual role '{role_name_to_assign}'.")
-
-    # 4. Store linked user
-    expires_at = (
-        datetime.utcnow() + timedelta(days=duration_days) if duration_days else None
-    )
-    await store_linked_user(
-        telegram_id=str(telegram_user_id),
-        jellyseerr_user_id=str(jellyseerr_user.get("id")),
-        jellyfin_user_id=str(jellyfin_user_id),
-        username=username,
-        expires_at=expires_at.isoformat() if expires_at else None,
-        guild_id=None,
-        role_name=role_name_to_assign,
-    )
-
-    # 5. DM Credentials
-    try:
-        dm_message = (
-            f"## Welcome to the Media Server! 🎉\n\n"
-            f"An account has been created for you. Here are your login details:\n\n"
-            f"**Username:** `{username}`\n"
-            f"**Temporary Password:** `{temp_password}`\n\n"
-            f"Please change your password after logging in.\n\n"
-            f"🔗 Jellyfin: {jellyfin_url}\n"
-            f"🔗 Jellyseerr: {jellyseerr_url}\n\n"
-        )
-        if duration_days:
-            dm_message += f"**Note:** This is a temporary account that will expire in {duration_days} days."
-
-        await app_client.send_message(
-            chat_id=telegram_user_id, text=dm_message, parse_mode=ParseMode.MARKDOWN
-        )
-        await reply_message.edit(
-            f"✅ Successfully created account for `{username}` and sent them a DM."
-        )
-    except Exception as e:
-        logger.warning(f"Failed to DM user {telegram_user_id}: {e}")
-        await reply_message.edit(
-            f"✅ Account for {username} created, but I could not DM them.\nPassword: `{temp_password}`"
-        )
-
-
 @app.on_message(filters.command("invite", prefixes="/"))
 async def invite_cmd(client: Client, message: Message):
     if message.from_user.id not in ADMIN_USER_IDS:
@@ -225,9 +44,9 @@ async def invite_cmd(client: Client, message: Message):
     target_id = target_user.id
     target_username = target_user.username or f"tg_user_{target_id}"
     sent_message = await message.reply(
-        f"Processing permanent invite for {html.escape(target_username)}..."
+        f"Queued permanent invite for {html.escape(target_username)}..."
     )
-    await _create_user(client, sent_message, target_id, target_username, None, None)
+    await enqueue_invite(sent_message, target_id, target_username, None, None)
 
 
 @app.on_message(filters.command("trial", prefixes="/"))
@@ -244,9 +63,9 @@ async def trial_cmd(client: Client, message: Message):
     target_id = target_user.id
     target_username = target_user.username or f"tg_user_{target_id}"
     sent_message = await message.reply(
-        f"Processing 7-day trial for {html.escape(target_username)}..."
+        f"Queued 7-day trial for {html.escape(target_username)}..."
     )
-    await _create_user(client, sent_message, target_id, target_username, 7, "Trial")
+    await enqueue_invite(sent_message, target_id, target_username, 7, "Trial")
 
 
 @app.on_message(filters.command("vip", prefixes="/"))
@@ -263,9 +82,144 @@ async def vip_cmd(client: Client, message: Message):
     target_id = target_user.id
     target_username = target_user.username or f"tg_user_{target_id}"
     sent_message = await message.reply(
-        f"Processing 30-day VIP invite for {html.escape(target_username)}..."
+        f"Queued 30-day VIP invite for {html.escape(target_username)}..."
     )
-    await _create_user(client, sent_message, target_id, target_username, 30, "VIP")
+    await enqueue_invite(sent_message, target_id, target_username, 30, "VIP")
+
+
+BULK_INVITE_PLANS = {
+    "invite": ("permanent invite", None, None),
+    "trial": ("7-day trial", 7, "Trial"),
+    "vip": ("30-day VIP invite", 30, "VIP"),
+}
+MAX_BULK_INVITES = 50
+
+
+@app.on_message(filters.command("bulkinvite", prefixes="/"))
+async def bulk_invite_cmd(client: Client, message: Message):
+    if message.from_user.id not in ADMIN_USER_IDS:
+        await message.reply("❌ You are not authorized to use this command.")
+        return
+
+    args = message.command[1:]
+    plan = "invite"
+    if args and args[0].lower() in BULK_INVITE_PLANS:
+        plan = args.pop(0).lower()
+    plan_label, duration_days, role_name = BULK_INVITE_PLANS[plan]
+
+    target_ids = [int(arg) for arg in args if arg.isdigit()]
+    if message.reply_to_message and message.reply_to_message.from_user:
+        target_ids.insert(0, message.reply_to_message.from_user.id)
+    target_ids = list(dict.fromkeys(target_ids))
+
+    if not target_ids:
+        await message.reply(
+            "Usage: `/bulkinvite [invite|trial|vip] <user_id> <user_id> ...` "
+            "(or reply to a user's message)",
+            parse_mode=None,
+        )
+        return
+    if len(target_ids) > MAX_BULK_INVITES:
+        await message.reply(f"❌ You can queue at most {MAX_BULK_INVITES} at once.")
+        return
+
+    # Resolve usernames in one call; unknown users fall back to tg_user_<id>
+    usernames = {}
+    try:
+        users = await client.get_users(target_ids)
+        usernames = {u.id: u.username for u in users if u.username}
+    except Exception as e:
+        logger.warning(f"Could not resolve some users for bulk invite: {e}")
+
+    for target_id in target_ids:
+        target_username = usernames.get(target_id) or f"tg_user_{target_id}"
+        sent_message = await message.reply(
+            f"Queued {plan_label} for {html.escape(target_username)}..."
+        )
+        await enqueue_invite(
+            sent_message, target_id, target_username, duration_days, role_name
+        )
+
+
+USERS_PER_PAGE = 25
+LIST_USERS_USAGE = (
+    "Usage: `/listusers [linked|unlinked|admins|expiring <days>]`\n"
+    "Example: `/listusers expiring 7`"
+)
+
+
+def _parse_expiry(expires_at: str | None) -> datetime | None:
+    try:
+        return datetime.fromisoformat(expires_at) if expires_at else None
+    except ValueError:
+        return None
+
+
+def _parse_user_filter(args: list[str]):
+    """Returns (title, predicate) for /listusers arguments, or None if invalid."""
+    if not args:
+        return "All Jellyfin Users", lambda row: True
+
+    kind = args[0].lower()
+    if kind == "linked":
+        return "Linked Users", lambda row: row["telegram_id"]
+    if kind == "unlinked":
+        return "Unlinked Users", lambda row: not row["telegram_id"]
+    if kind == "admins":
+        return "Admin Users", lambda row: row["is_admin"]
+    if kind == "expiring" and len(args) > 1 and args[1].isdigit():
+        days = int(args[1])
+        cutoff = datetime.utcnow() + timedelta(days=days)
+        return (
+            f"Users Expiring Within {days} Days",
+            lambda row: row["expires_at"] and row["expires_at"] <= cutoff,
+        )
+    return None
+
+
+async def _build_user_rows() -> list[dict]:
+    """Joins Jellyfin users with the bot's linked users in a single pass."""
+    jellyfin_users = await get_jellyfin_users()
+    linked_by_jellyfin_id = {
+        row[4]: row for row in await get_all_linked_users() if row[4]
+    }
+
+    rows = []
+    for user in jellyfin_users:
+        linked = linked_by_jellyfin_id.get(user.get("Id"))
+        rows.append(
+            {
+                "name": user.get("Name", "Unknown"),
+                "is_admin": user.get("Policy", {}).get("IsAdministrator", False),
+                "telegram_id": linked[0] if linked else None,
+                "role": linked[2] if linked else None,
+                "expires_at": _parse_expiry(linked[3]) if linked else None,
+            }
+        )
+    return rows
+
+
+def _format_user_row(row: dict) -> str:
+    line = f"• <code>{html.escape(row['name'])}</code>"
+    if row["is_admin"]:
+        line += " (Admin)"
+    if row["telegram_id"]:
+        line += f" — TG <code>{row['telegram_id']}</code>"
+    if row["role"]:
+        line += f" — {html.escape(row['role'])}"
+    if row["expires_at"]:
+        line += f" — expires {row['expires_at']:%Y-%m-%d}"
+    return line
+
+
+def _render_user_page(listing: dict, page: int) -> str:
+    rows = listing["rows"]
+    start = page * USERS_PER_PAGE
+    text = f"<b>{listing['title']}</b> ({len(rows)})\n\n"
+    text += "\n".join(
+        _format_user_row(row) for row in rows[start : start + USERS_PER_PAGE]
+    )
+    return text
 
 
 @app.on_message(filters.command("listusers", prefixes="/") & filters.private)
@@ -274,35 +228,69 @@ async def list_users_cmd(client: Client, message: Message):
         await message.reply("❌ You are not authorized to use this command.")
         return
 
+    user_filter = _parse_user_filter(message.command[1:])
+    if user_filter is None:
+        await message.reply(LIST_USERS_USAGE, parse_mode=None)
+        return
+    title, predicate = user_filter
+
     sent_message = await message.reply("Fetching users from Jellyfin API...")
 
     try:
-        users_url = f"{settings.JELLYFIN_URL}/Users"
-        response = await http_client.get(
-            users_url, headers=jellyfin_headers, timeout=10
-        )
-        response.raise_for_status()
-        jellyfin_users = response.json()
-
-    except httpx.RequestError as e:
+        rows = await _build_user_rows()
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
         await sent_message.edit(
             f"❌ An error occurred while fetching users from Jellyfin: {e}"
         )
         return
 
-    if not jellyfin_users:
+    if not rows:
         await sent_message.edit("No users found on the Jellyfin server.")
         return
 
-    reply_text = "<b>Jellyfin Server User List:</b>\n\n"
-    for user in jellyfin_users:
-        username = user.get("Name", "Unknown")
-        is_admin = user.get("Policy", {}).get("IsAdministrator", False)
-        admin_tag = " (Admin)" if is_admin else ""
+    rows = [row for row in rows if predicate(row)]
+    if not rows:
+        await sent_message.edit("No users match that filter.")
+        return
+
+    # Snapshot the listing so page turns never hit Jellyfin or the DB again
+    listing = {"title": title, "rows": rows}
+    session_id = create_pagination_session(listing)
+    total_pages = -(-len(rows) // USERS_PER_PAGE)
+    await sent_message.edit(
+        _render_user_page(listing, 0),
+        reply_markup=create_list_pagination_markup(session_id, 0, total_pages),
+        parse_mode=ParseMode.HTML,
+    )
+
+
+@app.on_callback_query(filters.regex(r"list_nav:([\w-]+):(\d+)"))
+async def list_users_pagination_handler(client: Client, callback_query: CallbackQuery):
+    if callback_query.from_user.id not in ADMIN_USER_IDS:
+        await callback_query.answer("This is not for you.", show_alert=True)
+        return
+
+    session_id, page_str = callback_query.matches[0].groups()
+    page = int(page_str)
+
+    listing = get_pagination_session(session_id)
+    if not listing:
+        await callback_query.answer(
+            "This list has expired. Please run /listusers again.", show_alert=True
+        )
+        return
 
-        reply_text += f"• <code>{html.escape(username)}</code>{admin_tag}\n"
+    total_pages = -(-len(listing["rows"]) // USERS_PER_PAGE)
+    if not (0 <= page < total_pages):
+        await callback_query.answer("You are at the end of the list.")
+        return
 
-    await sent_message.edit(reply_text, parse_mode=ParseMode.HTML)
+    await callback_query.edit_message_text(
+        _render_user_page(listing, page),
+        reply_markup=create_list_pagination_markup(session_id, page, total_pages),
+        parse_mode=ParseMode.HTML,
+    )
+    await callback_query.answer()
 
 
 @app.on_message(filters.command("deleteuser", prefixes="/") & filters.private)
@@ -333,21 +321,7 @@ async def delete_user_cmd(client: Client, message: Message):
             f"User '{html.escape(username_to_delete)}' not in bot DB. Trying to find on Jellyfin..."
         )
         try:
-            users_url = f"{settings.JELLYFIN_URL}/Users"
-            response = await http_client.get(
-                users_url, headers=jellyfin_headers, timeout=10
-            )
-            response.raise_for_status()
-            jellyfin_users = response.json()
-
-            found_user = next(
-                (
-                    u
-                    for u in jellyfin_users
-                    if u.get("Name").lower() == username_to_delete.lower()
-                ),
-                None,
-            )
+            found_user = await find_jellyfin_user_by_name(username_to_delete)
 
             if not found_user:
                 await sent_message.edit(
@@ -361,21 +335,7 @@ async def delete_user_cmd(client: Client, message: Message):
                 f"Found Jellyfin ID ({jellyfin_user_id}). Now finding Jellyseerr user..."
             )
 
-            seerr_users_url = f"{settings.JELLYSEERR_URL}/api/v1/user?take=1000"
-            seerr_response = await http_client.get(
-                seerr_users_url, headers=jellyseerr_headers
-            )
-            seerr_response.raise_for_status()
-            seerr_users = seerr_response.json().get("results", [])
-
-            found_seerr_user = next(
-                (
-                    u
-                    for u in seerr_users
-                    if str(u.get("jellyfinUserId")) == str(jellyfin_user_id)
-                ),
-                None,
-            )
+            found_seerr_user = await find_by_jellyfin_id(jellyfin_user_id)
 
             if found_seerr_user:
                 jellyseerr_user_id = found_seerr_user.get("id")
@@ -397,20 +357,20 @@ async def delete_user_cmd(client: Client, message: Message):
 
     try:
         if jellyfin_user_id:
-            jf_del_url = f"{settings.JELLYFIN_URL}/Users/{jellyfin_user_id}"
-            jf_res = await http_client.delete(
-                jf_del_url, headers=jellyfin_headers, timeout=10
+            jf_res = await jellyfin_client.delete(
+                f"/Users/{jellyfin_user_id}", timeout=10
             )
             jf_res.raise_for_status()
+            invalidate_jellyfin_users()
             logger.info(f"Deleted Jellyfin user: {jellyfin_user_id}")
 
         if jellyseerr_user_id:
-            js_del_url = f"{settings.JELLYSEERR_URL}/api/v1/user/{jellyseerr_user_id}"
-            js_res = await http_client.delete(
-                js_del_url, headers=jellyseerr_headers, timeout=10
+            js_res = await jellyseerr_client.delete(
+                f"/api/v1/user/{jellyseerr_user_id}", timeout=10
             )
             if js_res.status_code != 404:
                 js_res.raise_for_status()
+            forget_user(jellyseerr_user_id)
             logger.info(f"Deleted Jellyseerr user: {jellyseerr_user_id}")
         else:
             logger.warning(
@@ -27,6 +27,7 @@ HELP_TEXT = """
 • `/discover`: Browse popular and trending media.
 • `/requests`: View the status of your past requests.
 • `/watch`: See your personal watch statistics from Jellyfin.
+• `/leaderboard [week|all]`: See who watched the most this week or of all time.
 
 **Direct Link Support:**
 You can also send TMDB links directly to request media:
@@ -37,7 +38,8 @@ You can also send TMDB links directly to request media:
 • `/invite` (reply to a user): Create a permanent account for the user.
 • `/trial` (reply to a user): Create a 7-day trial account for the user.
 • `/vip` (reply to a user): Create a 30-day trial account for the user.
-• `/listusers`: List all users registered in the bot's database.
+• `/bulkinvite [invite|trial|vip] <user_id> ...`: Queue invites for several users at once.
+• `/listusers [linked|unlinked|admins|expiring <days>]`: Browse Jellyfin users with their linked Telegram ID, role and expiry.
 • `/deleteuser <username>`: Delete a user from Jellyfin, Jellyseerr, and the bot.
 """
 
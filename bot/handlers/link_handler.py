@@ -6,11 +6,11 @@ from pyrogram.types import Message
 from pyrogram.enums import ParseMode
 
 from bot import app
-from config import settings
-from bot.services.http_clients import http_client, jellyseerr_headers
+from bot.services.media_details import get_media_details
+from bot.helpers.posters import send_poster
 from bot.helpers.formatting import format_media_item
 from bot.helpers.markup import create_media_pagination_markup
-from bot.state import requested_items
+from bot.services.requested_items import is_requested
 
 logger = logging.getLogger(__name__)
 
@@ -36,11 +36,8 @@ def extract_tmdb_info(text: str) -> tuple[str, str] | None:
 async def lookup_by_tmdb_id(media_type: str, tmdb_id: str) -> dict | None:
     """Lookup media by TMDB ID using Jellyseerr API."""
     try:
-        url = f"{settings.JELLYSEERR_URL}/api/v1/{media_type}/{tmdb_id}"
-
-        response = await http_client.get(url, headers=jellyseerr_headers)
-        response.raise_for_status()
-        data = response.json()
+        # Copy so the mediaType fix below doesn't touch the shared cached dict
+        data = dict(await get_media_details(media_type, tmdb_id))
 
         # Fix: mediaType - Jellyseerr API returns "unknown" for direct lookups
         # Override with the actual media type we know from the URL
@@ -70,11 +67,13 @@ async def lookup_by_tmdb_id(media_type: str, tmdb_id: str) -> dict | None:
             "discover",
             "requests",
             "watch",
+            "leaderboard",
             "link",
             "unlink",
             "invite",
             "trial",
             "vip",
+            "bulkinvite",
             "deleteuser",
             "listusers",
         ]
@@ -104,27 +103,20 @@ async def handle_url_links(client: Client, message: Message):
 
     # Format the response
     text, photo_url = format_media_item(media_info, 0, 1)
-    is_requested = (
-        media_info.get("mediaType"),
-        media_info.get("id"),
-    ) in requested_items
+    item_requested = await is_requested(
+        media_info.get("mediaType"), media_info.get("id")
+    )
     markup = create_media_pagination_markup(
-        query="url_lookup",
+        session_id="url_lookup",
         current_index=0,
         total_results=1,
         media_type=media_info.get("mediaType", ""),
         tmdb_id=media_info.get("id", 0),
-        is_requested=is_requested,
+        is_requested=item_requested,
     )
 
     if photo_url:
-        await client.send_photo(
-            chat_id=message.chat.id,
-            photo=photo_url,
-            caption=text,
-            reply_markup=markup,
-            parse_mode=ParseMode.HTML,
-        )
+        await send_poster(client, message.chat.id, photo_url, text, markup)
     else:
         await message.reply(text, reply_markup=markup, parse_mode=ParseMode.HTML)
 
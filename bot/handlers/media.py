@@ -2,12 +2,10 @@ import httpx
 import logging
 
 from urllib.parse import urlencode, quote
-from datetime import datetime
 from pyrogram import Client, filters
 from pyrogram.types import (
     Message,
     CallbackQuery,
-    InputMediaPhoto,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
 )
@@ -16,34 +14,47 @@ from pyrogram.enums import ParseMode
 from bot import app
 
 from config import settings
-from bot.services.http_clients import http_client, jellyseerr_headers
+from bot.services.http_clients import jellyseerr_client
 from bot.services.database import get_linked_user
+from bot.services.cache import SingleFlight, TTLCache
+from bot.services.discover import get_discover_feed
+from bot.services.requested_items import is_requested, mark_requested
+from bot.services.request_mirror import schedule_requests_sync
+from bot.services.sessions import create_pagination_session, get_pagination_session
+from bot.helpers.posters import send_poster, edit_poster, warm_poster
+from bot.helpers.prefetch import card_prefetcher, prefetch_neighbours
 from bot.helpers.formatting import format_media_item
 from bot.helpers.markup import create_media_pagination_markup
 
 logger = logging.getLogger(__name__)
 
-CACHE_TTL_SECONDS = 3600  # 1 hour
-# Import shared state for tracking requested items
-from bot.state import requested_items
+
+search_cache = TTLCache(
+    max_size=settings.SEARCH_CACHE_MAX_SIZE, ttl=settings.CACHE_TTL_SECONDS
+)
+search_flights = SingleFlight()
+
+
+def _normalize_query(query: str) -> str:
+    """Collapses whitespace and case so equivalent queries share a cache key."""
+    return " ".join(query.split()).casefold()
 
 
 async def _search_jellyseerr(query: str):
-    if not hasattr(http_client, "search_cache"):
-        http_client.search_cache = {}
+    query = _normalize_query(query)
+    results = search_cache.get(query)
+    if results is not None:
+        logger.info(f"Returning cached search results for: {query}")
+        return results
+
+    return await search_flights.do(query, lambda: _fetch_search_results(query))
 
-    if query in http_client.search_cache:
-        results, timestamp = http_client.search_cache[query]
-        if (datetime.utcnow() - timestamp).total_seconds() < CACHE_TTL_SECONDS:
-            logger.info(f"Returning cached search results for: {query}")
-            return results
 
-    search_url = f"{settings.JELLYSEERR_URL}/api/v1/search"
+async def _fetch_search_results(query: str):
+    # Jellyseerr rejects '+' for spaces, so the query is percent-encoded by hand
     params = urlencode({"query": query}, quote_via=quote)
     try:
-        response = await http_client.get(
-            f"{search_url}?{params}", headers=jellyseerr_headers
-        )
+        response = await jellyseerr_client.get(f"/api/v1/search?{params}")
         response.raise_for_status()
         all_results = response.json().get("results", [])
 
@@ -52,39 +63,26 @@ async def _search_jellyseerr(query: str):
             item for item in all_results if item.get("mediaType") in ["movie", "tv"]
         ]
 
-        http_client.search_cache[query] = (results, datetime.utcnow())
+        search_cache.set(query, results)
         return results
     except httpx.RequestError as e:
         logger.error(f"Error searching Jellyseerr: {e}")
         return []
 
 
-async def _discover_jellyseerr():
-    if hasattr(http_client, "discover_cache"):
-        results, timestamp = http_client.discover_cache
-        if (datetime.utcnow() - timestamp).total_seconds() < CACHE_TTL_SECONDS:
-            logger.info("Returning cached discover results.")
-            return results
+async def _render_media_card(results: list[dict], index: int):
+    text, photo_url = format_media_item(results[index], index, len(results))
+    await warm_poster(photo_url)
+    return text, photo_url
 
-    try:
-        movies_url = f"{settings.JELLYSEERR_URL}/api/v1/discover/movies"
-        tv_url = f"{settings.JELLYSEERR_URL}/api/v1/discover/tv"
-
-        movie_response = await http_client.get(movies_url, headers=jellyseerr_headers)
-        tv_response = await http_client.get(tv_url, headers=jellyseerr_headers)
 
-        movie_response.raise_for_status()
-        tv_response.raise_for_status()
-
-        results = movie_response.json().get("results", []) + tv_response.json().get(
-            "results", []
-        )
-
-        http_client.discover_cache = (results, datetime.utcnow())
-        return results
-    except httpx.RequestError as e:
-        logger.error(f"Error discovering media: {e}")
-        return []
+def _prefetch_media_cards(session_id: str, results: list[dict], index: int):
+    prefetch_neighbours(
+        index,
+        len(results),
+        key=lambda i: ("media", session_id, i),
+        render=lambda i: _render_media_card(results, i),
+    )
 
 
 @app.on_message(filters.command("request", prefixes="/"))
@@ -104,10 +102,11 @@ async def request_cmd(client: Client, message: Message):
         await sent_message.edit("No results found for your query.")
         return
 
+    session_id = create_pagination_session(results)
     item = results[0]
     text, photo_url = format_media_item(item, 0, len(results))
     markup = create_media_pagination_markup(
-        query=query,
+        session_id=session_id,
         current_index=0,
         total_results=len(results),
         media_type=item.get("mediaType"),
@@ -115,77 +114,56 @@ async def request_cmd(client: Client, message: Message):
     )
 
     if photo_url:
-        await client.send_photo(
-            chat_id=message.chat.id,
-            photo=photo_url,
-            caption=text,
-            reply_markup=markup,
-            parse_mode=ParseMode.HTML,
-        )
+        await send_poster(client, message.chat.id, photo_url, text, markup)
         await sent_message.delete()
     else:
         await sent_message.edit(text, reply_markup=markup, parse_mode=ParseMode.HTML)
 
+    _prefetch_media_cards(session_id, results, 0)
+
 
 @app.on_message(filters.command("discover", prefixes="/"))
 async def discover_cmd(client: Client, message: Message):
     sent_message = await message.reply("Discovering popular items...")
 
-    results = await _discover_jellyseerr()
+    results = await get_discover_feed()
     if not results:
         await sent_message.edit("No popular items found to discover.")
         return
 
-    query = "discover"
+    session_id = create_pagination_session(results)
     item = results[0]
     text, photo_url = format_media_item(item, 0, len(results))
-    is_requested = (item.get("mediaType"), item.get("id")) in requested_items
+    item_requested = await is_requested(item.get("mediaType"), item.get("id"))
     markup = create_media_pagination_markup(
-        query=query,
+        session_id=session_id,
         current_index=0,
         total_results=len(results),
         media_type=item.get("mediaType"),
         tmdb_id=item.get("id"),
-        is_requested=is_requested,
+        is_requested=item_requested,
     )
 
     if photo_url:
-        await client.send_photo(
-            chat_id=message.chat.id,
-            photo=photo_url,
-            caption=text,
-            reply_markup=markup,
-            parse_mode=ParseMode.HTML,
-        )
+        await send_poster(client, message.chat.id, photo_url, text, markup)
         await sent_message.delete()
     else:
         await sent_message.edit(text, reply_markup=markup, parse_mode=ParseMode.HTML)
 
+    _prefetch_media_cards(session_id, results, 0)
+
 
-@app.on_callback_query(filters.regex(r"media_nav:(prev|next):(\d+):(.+)"))
+@app.on_callback_query(filters.regex(r"media_nav:(prev|next):(\d+):([\w-]+)"))
 async def media_pagination_handler(client: Client, callback_query: CallbackQuery):
     match = callback_query.matches[0]
-    direction, current_index_str, query = match.groups()
+    direction, current_index_str, session_id = match.groups()
     current_index = int(current_index_str)
 
-    results = []
-    if query == "discover":
-        cached_data = getattr(http_client, "discover_cache", None)
-        if cached_data:
-            results, _ = cached_data
-        else:
-            results = await _discover_jellyseerr()
-
-    elif query == "url_lookup":
+    if session_id == "url_lookup":
         await callback_query.answer("No more results to navigate.")
         return
 
-    else:
-        cached_data = getattr(http_client, "search_cache", {}).get(query)
-        if cached_data:
-            results, _ = cached_data
-        else:
-            results = await _search_jellyseerr(query)
+    results = get_pagination_session(session_id)
 
     if not results:
         await callback_query.answer(
@@ -201,27 +179,23 @@ async def media_pagination_handler(client: Client, callback_query: CallbackQuery
         return
 
     item = results[new_index]
-    text, photo_url = format_media_item(item, new_index, len(results))
-    is_requested = (item.get("mediaType"), item.get("id")) in requested_items
+    text, photo_url = await card_prefetcher.get(
+        ("media", session_id, new_index),
+        lambda: _render_media_card(results, new_index),
+    )
+    item_requested = await is_requested(item.get("mediaType"), item.get("id"))
     markup = create_media_pagination_markup(
-        query=query,
+        session_id=session_id,
         current_index=new_index,
         total_results=len(results),
         media_type=item.get("mediaType"),
         tmdb_id=item.get("id"),
-        is_requested=is_requested,
+        is_requested=item_requested,
     )
 
     if photo_url:
         try:
-            await callback_query.edit_message_media(
-                media=InputMediaPhoto(
-                    media=photo_url,
-                    caption=text,
-                    parse_mode=ParseMode.HTML,
-                ),
-                reply_markup=markup,
-            )
+            await edit_poster(callback_query, photo_url, text, markup)
         except Exception as e:
             logger.error(f"Error updating poster in media pagination: {e}")
             await callback_query.edit_message_caption(
@@ -233,6 +207,7 @@ async def media_pagination_handler(client: Client, callback_query: CallbackQuery
         )
 
     await callback_query.answer()
+    _prefetch_media_cards(session_id, results, new_index)
 
 
 @app.on_callback_query(filters.regex(r"media_req:(\w+):(\d+)"))
@@ -251,7 +226,6 @@ async def media_request_handler(client: Client, callback_query: CallbackQuery):
 
     jellyseerr_user_id = int(linked_user_data[0])
 
-    request_url = f"{settings.JELLYSEERR_URL}/api/v1/request"
     payload = {
         "mediaType": media_type,
         "mediaId": tmdb_id,
@@ -261,13 +235,12 @@ async def media_request_handler(client: Client, callback_query: CallbackQuery):
         payload["seasons"] = "all"
 
     try:
-        response = await http_client.post(
-            request_url, headers=jellyseerr_headers, json=payload
-        )
+        response = await jellyseerr_client.post("/api/v1/request", json=payload)
         response.raise_for_status()
 
-        # Mark this item as requested
-        requested_items.add((media_type, tmdb_id))
+        # Mark this item as requested and pull it into the local mirror
+        await mark_requested(media_type, tmdb_id)
+        schedule_requests_sync()
 
         # Update the button to show "Requested"
         try:
@@ -294,7 +267,7 @@ async def media_request_handler(client: Client, callback_query: CallbackQuery):
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 409:
             # Already requested - update button state
-            requested_items.add((media_type, tmdb_id))
+            await mark_requested(media_type, tmdb_id)
             try:
                 keyboard = callback_query.message.reply_markup.inline_keyboard
                 request_button_row = keyboard[-1]
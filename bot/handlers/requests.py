@@ -1,20 +1,49 @@
 import httpx
 import logging
 from pyrogram import Client, filters
-from pyrogram.types import Message, CallbackQuery, InputMediaPhoto
+from pyrogram.types import Message, CallbackQuery
 from pyrogram.enums import ParseMode
 
 from bot import app
 
-from config import settings
-from bot.services.http_clients import http_client, jellyseerr_headers
 from bot.services.database import get_linked_user
+from bot.services.request_mirror import mirror_version
+from bot.services.user_requests import (
+    get_user_request,
+    get_user_request_count,
+    schedule_request_details_warm_up,
+)
+from bot.helpers.posters import send_poster, edit_poster, warm_poster
+from bot.helpers.prefetch import card_prefetcher, prefetch_neighbours
 from bot.helpers.formatting import format_request_item
 from bot.helpers.markup import create_requests_pagination_markup
 
 logger = logging.getLogger(__name__)
 
 
+async def _render_request_card(jellyseerr_user_id: str, index: int, total: int):
+    request = await get_user_request(jellyseerr_user_id, index)
+    if request is None:
+        return None
+    text, photo_url = await format_request_item(request, index, total)
+    await warm_poster(photo_url)
+    return text, photo_url
+
+
+def _request_card_key(jellyseerr_user_id: str, index: int, total: int):
+    # Includes the mirror version, so a sync never leaves stale cards behind
+    return ("request", jellyseerr_user_id, index, total, mirror_version())
+
+
+def _prefetch_request_cards(jellyseerr_user_id: str, index: int, total: int):
+    prefetch_neighbours(
+        index,
+        total,
+        key=lambda i: _request_card_key(jellyseerr_user_id, i, total),
+        render=lambda i: _render_request_card(jellyseerr_user_id, i, total),
+    )
+
+
 @app.on_message(filters.command("requests", prefixes="/"))
 async def my_requests_cmd(client: Client, message: Message):
     sent_message = await message.reply("Fetching your requests...")
@@ -28,54 +57,31 @@ async def my_requests_cmd(client: Client, message: Message):
     jellyseerr_user_id = linked_user[0]
 
     try:
-        request_api_url = f"{settings.JELLYSEERR_URL}/api/v1/request"
-        params = {
-            "take": 100,
-            "skip": 0,
-            "sort": "added",
-            "filter": "all",
-            "requestedBy": jellyseerr_user_id,
-        }
-
-        response = await http_client.get(
-            request_api_url, headers=jellyseerr_headers, params=params
-        )
-        response.raise_for_status()
-        user_requests_data = response.json().get("results", [])
-
-    except httpx.RequestError as e:
+        total = await get_user_request_count(jellyseerr_user_id)
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
         await sent_message.edit(
             f"❌ An error occurred while fetching your requests: {e}"
         )
         return
 
-    if not user_requests_data:
+    if total:
+        schedule_request_details_warm_up(jellyseerr_user_id)
+    card = await _render_request_card(jellyseerr_user_id, 0, total) if total else None
+    if card is None:
         await sent_message.edit("You have no pending or completed requests.")
         return
 
-    user_requests_data.sort(key=lambda r: r.get("createdAt", ""), reverse=True)
-
-    if not hasattr(client, "request_cache"):
-        client.request_cache = {}
-    client.request_cache[user_id] = user_requests_data
-
-    text, photo_url = await format_request_item(
-        user_requests_data[0], 0, len(user_requests_data)
-    )
-    markup = create_requests_pagination_markup(int(user_id), 0, len(user_requests_data))
+    text, photo_url = card
+    markup = create_requests_pagination_markup(int(user_id), 0, total)
 
     if photo_url:
-        await client.send_photo(
-            chat_id=message.chat.id,
-            photo=photo_url,
-            caption=text,
-            reply_markup=markup,
-            parse_mode=ParseMode.HTML,
-        )
+        await send_poster(client, message.chat.id, photo_url, text, markup)
         await sent_message.delete()
     else:
         await sent_message.edit(text, reply_markup=markup, parse_mode=ParseMode.HTML)
 
+    _prefetch_request_cards(jellyseerr_user_id, 0, total)
+
 
 @app.on_callback_query(filters.regex(r"req_nav:(prev|next):(\d+):(\d+)"))
 async def requests_pagination_handler(client: Client, callback_query: CallbackQuery):
@@ -88,66 +94,42 @@ async def requests_pagination_handler(client: Client, callback_query: CallbackQu
         await callback_query.answer("This is not for you.", show_alert=True)
         return
 
-    user_requests_data = getattr(client, "request_cache", {}).get(user_id)
+    linked_user = await get_linked_user(user_id)
+    if not linked_user or not linked_user[0]:
+        await callback_query.answer(
+            "Error: Could not find your linked account.", show_alert=True
+        )
+        return
+    jellyseerr_user_id = linked_user[0]
 
-    if not user_requests_data:
-        linked_user = await get_linked_user(user_id)
-        if not linked_user:
-            await callback_query.answer(
-                "Error: Could not find your linked account.", show_alert=True
-            )
-            return
-
-        request_api_url = f"{settings.JELLYSEERR_URL}/api/v1/request"
-        params = {
-            "take": 100,
-            "skip": 0,
-            "sort": "added",
-            "filter": "all",
-            "requestedBy": linked_user[0],
-        }
-        try:
-            response = await http_client.get(
-                request_api_url, headers=jellyseerr_headers, params=params
-            )
-            response.raise_for_status()
-            user_requests_data = response.json().get("results", [])
-            user_requests_data.sort(key=lambda r: r.get("createdAt", ""), reverse=True)
-            if not hasattr(client, "request_cache"):
-                client.request_cache = {}
-            client.request_cache[user_id] = user_requests_data
-        except Exception as e:
-            logger.error(f"Error re-fetching requests: {e}")
-            await callback_query.answer("Error re-fetching requests.", show_alert=True)
-            return
+    try:
+        total = await get_user_request_count(jellyseerr_user_id)
+    except Exception as e:
+        logger.error(f"Error loading requests: {e}")
+        await callback_query.answer("Error loading requests.", show_alert=True)
+        return
 
-    if not user_requests_data:
+    if not total:
         await callback_query.answer("You have no requests.", show_alert=True)
         return
 
     new_index = current_index + (1 if direction == "next" else -1)
-    if not (0 <= new_index < len(user_requests_data)):
+    card = None
+    if 0 <= new_index < total:
+        card = await card_prefetcher.get(
+            _request_card_key(jellyseerr_user_id, new_index, total),
+            lambda: _render_request_card(jellyseerr_user_id, new_index, total),
+        )
+    if card is None:
         await callback_query.answer("You are at the end of the list.")
         return
 
-    item = user_requests_data[new_index]
-    text, photo_url = await format_request_item(
-        item, new_index, len(user_requests_data)
-    )
-    markup = create_requests_pagination_markup(
-        int(user_id), new_index, len(user_requests_data)
-    )
+    text, photo_url = card
+    markup = create_requests_pagination_markup(int(user_id), new_index, total)
 
     if photo_url:
         try:
-            await callback_query.edit_message_media(
-                media=InputMediaPhoto(
-                    media=photo_url,
-                    caption=text,
-                    parse_mode=ParseMode.HTML,
-                ),
-                reply_markup=markup,
-            )
+            await edit_poster(callback_query, photo_url, text, markup)
         except Exception as e:
             logger.error(f"Error updating poster in requests pagination: {e}")
             await callback_query.edit_message_caption(
@@ -159,3 +141,4 @@ async def requests_pagination_handler(client: Client, callback_query: CallbackQu
         )
 
     await callback_query.answer()
+    _prefetch_request_cards(jellyseerr_user_id, new_index, total)
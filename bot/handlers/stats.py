@@ -6,9 +6,22 @@ from pyrogram.enums import ParseMode
 
 from bot import app
 
-from config import settings
-from bot.services.http_clients import http_client, jellyfin_headers
 from bot.services.database import get_linked_user
+from bot.services.watch_stats import (
+    LEADERBOARD_PERIODS,
+    get_user_watch_stats,
+    get_watch_leaderboard,
+)
+
+LEADERBOARD_TITLES = {"week": "This Week", "all": "All Time"}
+RANK_MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+
+def _format_duration(total_seconds: float) -> str:
+    days, remainder_seconds = divmod(total_seconds, 86400)
+    hours, remainder_seconds = divmod(remainder_seconds, 3600)
+    minutes, _ = divmod(remainder_seconds, 60)
+    return f"{int(days)}d {int(hours)}h {int(minutes)}m"
 
 
 @app.on_message(filters.command("watch", prefixes="/"))
@@ -29,56 +42,66 @@ async def watch_stats_cmd(client: Client, message: Message):
         )
         return
 
-    items_url = f"{settings.JELLYFIN_URL}/Users/{jellyfin_user_id}/Items"
-    params = {
-        "Recursive": "true",
-        "IncludeItemTypes": "Movie,Episode",
-        "Filters": "IsPlayed",
-        "Fields": "RunTimeTicks,UserData,SeriesName",
-    }
-
     try:
-        response = await http_client.get(
-            items_url, headers=jellyfin_headers, params=params
-        )
-        response.raise_for_status()
-        items = response.json().get("Items", [])
-    except httpx.RequestError as e:
+        stats = await get_user_watch_stats(jellyfin_user_id)
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
         await sent_message.edit(f"❌ Failed to fetch watch data from Jellyfin: {e}")
         return
 
-    watched_count = len(items)
-    total_ticks = sum(
-        item.get("RunTimeTicks", 0) for item in items if item.get("RunTimeTicks")
-    )
-    total_seconds = total_ticks / 10_000_000
-
-    days, remainder_seconds = divmod(total_seconds, 86400)
-    hours, remainder_seconds = divmod(remainder_seconds, 3600)
-    minutes, _ = divmod(remainder_seconds, 60)
-
     last_watched_title = "No specific last watched item found."
-    if items:
-        valid_items = [
-            i
-            for i in items
-            if i.get("UserData") and i.get("UserData").get("LastPlayedDate")
-        ]
-        if valid_items:
-            last_watched_item = max(
-                valid_items, key=lambda x: x["UserData"]["LastPlayedDate"]
-            )
-            title = last_watched_item.get("Name", "Unknown Title")
-            if last_watched_item.get("Type") == "Episode" and last_watched_item.get(
-                "SeriesName"
-            ):
-                title = f"{last_watched_item.get('SeriesName')} - {title}"
-            last_watched_title = html.escape(title)
+    if stats["last_played_title"]:
+        last_watched_title = html.escape(stats["last_played_title"])
 
     username_html = html.escape(message.from_user.first_name)
     text = f"📊 <b>{username_html}'s Watch Statistics</b>\n\n"
-    text += f"<b>📺 Total Watched Items:</b> {watched_count}\n"
-    text += f"<b>⏱️ Total Watch Time:</b> {int(days)}d {int(hours)}h {int(minutes)}m\n"
+    text += f"<b>📺 Total Watched Items:</b> {stats['watched_count']}\n"
+    text += f"<b>⏱️ Total Watch Time:</b> {_format_duration(stats['total_seconds'])}\n"
     text += f"<b>👀 Last Watched:</b> {last_watched_title}"
 
+    weekly = stats["weekly_seconds"]
+    if any(weekly):
+        text += "\n\n<b>📅 Recent Weeks:</b>\n"
+        for weeks_ago, seconds in enumerate(weekly):
+            label = "This week" if weeks_ago == 0 else f"{weeks_ago}w ago"
+            text += f"• {label}: {_format_duration(seconds)}\n"
+
+    if stats["top_series"]:
+        text += "\n<b>🏆 Top Series:</b>\n"
+        for series_name, episodes, seconds in stats["top_series"]:
+            text += (
+                f"• {html.escape(series_name)}: {episodes} episodes, "
+                f"{_format_duration(seconds)}\n"
+            )
+
     await sent_message.edit(text, parse_mode=ParseMode.HTML)
+
+
+@app.on_message(filters.command("leaderboard", prefixes="/"))
+async def leaderboard_cmd(client: Client, message: Message):
+    args = message.command[1:]
+    period = args[0].lower() if args else "week"
+    if period not in LEADERBOARD_PERIODS:
+        await message.reply("Usage: `/leaderboard [week|all]`")
+        return
+
+    linked_user = await get_linked_user(str(message.from_user.id))
+    jellyfin_user_id = linked_user[1] if linked_user else None
+    leaderboard = await get_watch_leaderboard(period, jellyfin_user_id)
+
+    text = f"🏆 <b>Watch Leaderboard — {LEADERBOARD_TITLES[period]}</b>\n\n"
+    if not leaderboard["top"]:
+        text += "Nobody has watched anything yet."
+    for rank, (username, seconds, count) in enumerate(leaderboard["top"], start=1):
+        medal = RANK_MEDALS.get(rank, f"{rank}.")
+        text += (
+            f"{medal} <b>{html.escape(username)}</b> — "
+            f"{_format_duration(seconds)} ({count} items)\n"
+        )
+
+    if me := leaderboard["me"]:
+        rank, seconds, count = me
+        text += (
+            f"\n<b>Your rank:</b> #{rank} — {_format_duration(seconds)} ({count} items)"
+        )
+
+    await message.reply(text, parse_mode=ParseMode.HTML)
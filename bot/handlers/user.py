@@ -4,8 +4,8 @@ from pyrogram.types import Message
 
 from bot import app
 
-from config import settings
-from bot.services.http_clients import http_client, jellyfin_headers, jellyseerr_headers
+from bot.services.http_clients import jellyfin_client
+from bot.services.jellyseerr_users import find_by_jellyfin_id
 from bot.services.database import store_linked_user, get_linked_user, delete_linked_user
 
 
@@ -21,16 +21,12 @@ async def link_cmd(client: Client, message: Message):
 
     sent_message = await message.reply("Linking your account...")
 
-    jellyfin_url = settings.JELLYFIN_URL
-    jellyseerr_url = settings.JELLYSEERR_URL
-
     # 1. Authenticate with Jellyfin
     jellyfin_user_id = None
     try:
         auth_payload = {"Username": jellyfin_username, "Pw": password}
-        jellyfin_auth_url = f"{jellyfin_url}/Users/AuthenticateByName"
-        auth_response = await http_client.post(
-            jellyfin_auth_url, json=auth_payload, headers=jellyfin_headers
+        auth_response = await jellyfin_client.post(
+            "/Users/AuthenticateByName", json=auth_payload
         )
 
         if auth_response.status_code == 401:
@@ -52,21 +48,7 @@ async def link_cmd(client: Client, message: Message):
 
     # 2. Find corresponding Jellyseerr user
     try:
-        seerr_users_url = f"{jellyseerr_url}/api/v1/user?take=1000"
-        seerr_response = await http_client.get(
-            seerr_users_url, headers=jellyseerr_headers
-        )
-        seerr_response.raise_for_status()
-        seerr_users = seerr_response.json().get("results", [])
-
-        found_seerr_user = next(
-            (
-                u
-                for u in seerr_users
-                if str(u.get("jellyfinUserId")) == str(jellyfin_user_id)
-            ),
-            None,
-        )
+        found_seerr_user = await find_by_jellyfin_id(jellyfin_user_id)
 
         if not found_seerr_user:
             await sent_message.edit(
@@ -78,7 +60,7 @@ async def link_cmd(client: Client, message: Message):
         jellyseerr_user_id_for_link = found_seerr_user.get("id")
         jellyseerr_username = found_seerr_user.get("username") or jellyfin_username
 
-    except httpx.RequestError as e:
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
         await sent_message.edit(f"❌ Failed to fetch users from Jellyseerr: {e}")
         return
 
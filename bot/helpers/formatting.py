@@ -2,8 +2,8 @@ import httpx
 import html
 import logging
 
-from config import settings
-from bot.services.http_clients import http_client, jellyseerr_headers
+from bot.services.http_clients import tmdb_image_client
+from bot.services.media_details import get_media_details
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +15,7 @@ async def validate_poster_url(url: str) -> bool:
     if not url:
         return False
     try:
-        response = await http_client.head(url, timeout=5.0)
+        response = await tmdb_image_client.head(url)
         return response.status_code == 200
     except Exception:
         return False
@@ -61,8 +61,8 @@ async def format_request_item(
 ) -> (str, str):
     """
     Formats a request item.
-    NOTE: This function is modified to use the centralized http_client
-    and settings instead of receiving them as arguments.
+    Media details come from the shared media details cache, so titles requested
+    by many users are only fetched from Jellyseerr once per TTL.
     """
     media = request.get("media", {})
     media_type = media.get("mediaType", "unknown")
@@ -72,11 +72,7 @@ async def format_request_item(
         return "<b>Error</b>: Request is missing a TMDB ID.", ""
 
     try:
-        endpoint = "tv" if media_type == "tv" else "movie"
-        media_info_url = f"{settings.JELLYSEERR_URL}/api/v1/{endpoint}/{tmdb_id}"
-        response = await http_client.get(media_info_url, headers=jellyseerr_headers)
-        response.raise_for_status()
-        media_info = response.json()
+        media_info = await get_media_details(media_type, tmdb_id)
     except httpx.RequestError as e:
         logger.error(f"Error fetching media details: {e}")
         return "<b>Error</b>: Could not fetch details for this request.", ""
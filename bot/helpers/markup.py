@@ -2,7 +2,7 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 
 def create_media_pagination_markup(
-    query: str,
+    session_id: str,
     current_index: int,
     total_results: int,
     media_type: str,
@@ -18,7 +18,7 @@ def create_media_pagination_markup(
             nav_row.append(
                 InlineKeyboardButton(
                     text="⬅️ Previous",
-                    callback_data=f"media_nav:prev:{current_index}:{query}",
+                    callback_data=f"media_nav:prev:{current_index}:{session_id}",
                 )
             )
         else:
@@ -28,7 +28,7 @@ def create_media_pagination_markup(
             nav_row.append(
                 InlineKeyboardButton(
                     text="Next ➡️",
-                    callback_data=f"media_nav:next:{current_index}:{query}",
+                    callback_data=f"media_nav:next:{current_index}:{session_id}",
                 )
             )
         else:
@@ -78,3 +78,39 @@ def create_requests_pagination_markup(
 
     buttons.append(nav_row)
     return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def create_list_pagination_markup(
+    session_id: str, current_page: int, total_pages: int
+) -> InlineKeyboardMarkup | None:
+    if total_pages <= 1:
+        return None
+
+    nav_row = []
+    if current_page > 0:
+        nav_row.append(
+            InlineKeyboardButton(
+                text="⬅️ Previous",
+                callback_data=f"list_nav:{session_id}:{current_page - 1}",
+            )
+        )
+    else:
+        nav_row.append(InlineKeyboardButton(text=" ", callback_data="noop"))
+
+    nav_row.append(
+        InlineKeyboardButton(
+            text=f"{current_page + 1}/{total_pages}", callback_data="noop"
+        )
+    )
+
+    if current_page < total_pages - 1:
+        nav_row.append(
+            InlineKeyboardButton(
+                text="Next ➡️",
+                callback_data=f"list_nav:{session_id}:{current_page + 1}",
+            )
+        )
+    else:
+        nav_row.append(InlineKeyboardButton(text=" ", callback_data="noop"))
+
+    return InlineKeyboardMarkup(inline_keyboard=[nav_row])
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+async def wait_until_visible(
+    probe: Callable[[], Awaitable[Any]],
+    timeout: float,
+    initial_delay: float = 0.25,
+    max_delay: float = 4.0,
+) -> Any:
+    """
+    Polls `probe()` until it returns a truthy value or `timeout` seconds pass.
+    Delays grow exponentially with full jitter; probe errors count as misses.
+    Returns the probe's result, or None if the deadline was reached.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    attempt = 0
+
+    while True:
+        attempt += 1
+        try:
+            if result := await probe():
+                logger.debug(f"Probe succeeded after {attempt} attempts.")
+                return result
+        except Exception as e:
+            logger.debug(f"Probe attempt {attempt} failed: {e}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.warning(f"Probe gave up after {attempt} attempts ({timeout}s).")
+            return None
+
+        await asyncio.sleep(min(random.uniform(0, delay), remaining))
+        delay = min(delay * 2, max_delay)
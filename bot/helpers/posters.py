@@ -0,0 +1,134 @@
+import logging
+from pyrogram import Client
+from pyrogram.errors import (
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+    MediaInvalid,
+    WebpageMediaEmpty,
+)
+from pyrogram.types import CallbackQuery, InputMediaPhoto, Message
+from pyrogram.enums import ParseMode
+
+from bot.helpers.formatting import TMDB_IMAGE_BASE_URL
+from bot.services.cache import TTLCache
+from bot.services.database import (
+    get_poster_file_id,
+    store_poster_file_id,
+    delete_poster_file_id,
+)
+
+logger = logging.getLogger(__name__)
+
+# Hot posters are kept in memory so repeat sends skip the database as well
+_file_id_cache = TTLCache(max_size=2000, ttl=24 * 3600)
+
+# Errors meaning Telegram no longer accepts a stored file_id. Pyrogram raises
+# ValueError for a file_id it can't decode. Anything else (FloodWait, network
+# errors, MESSAGE_NOT_MODIFIED) says nothing about the file_id and propagates.
+STALE_FILE_ID_ERRORS = (
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+    MediaInvalid,
+    WebpageMediaEmpty,
+    ValueError,
+)
+
+
+def _poster_path(photo_url: str) -> str:
+    return photo_url.removeprefix(TMDB_IMAGE_BASE_URL)
+
+
+async def _lookup_file_id(poster_path: str) -> str | None:
+    file_id = _file_id_cache.get(poster_path)
+    if file_id is None:
+        file_id = await get_poster_file_id(poster_path)
+        if file_id:
+            _file_id_cache.set(poster_path, file_id)
+    return file_id
+
+
+async def _remember_file_id(poster_path: str, message):
+    photo = getattr(message, "photo", None)
+    if not photo:
+        return
+    _file_id_cache.set(poster_path, photo.file_id)
+    try:
+        await store_poster_file_id(poster_path, photo.file_id)
+    except Exception as e:
+        logger.warning(f"Failed to store file_id for poster {poster_path}: {e}")
+
+
+async def _forget_file_id(poster_path: str):
+    _file_id_cache.pop(poster_path)
+    await delete_poster_file_id(poster_path)
+
+
+async def warm_poster(photo_url: str):
+    """Loads a poster's file_id into memory ahead of a page turn."""
+    if photo_url:
+        await _lookup_file_id(_poster_path(photo_url))
+
+
+async def send_poster(
+    client: Client, chat_id: int, photo_url: str, caption: str, reply_markup
+) -> Message:
+    """
+    Sends a TMDB poster, reusing Telegram's file_id when the poster was sent before
+    so Telegram doesn't have to download the image again.
+    """
+    poster_path = _poster_path(photo_url)
+    if file_id := await _lookup_file_id(poster_path):
+        try:
+            return await client.send_photo(
+                chat_id=chat_id,
+                photo=file_id,
+                caption=caption,
+                reply_markup=reply_markup,
+                parse_mode=ParseMode.HTML,
+            )
+        except STALE_FILE_ID_ERRORS as e:
+            logger.warning(f"Cached file_id for {poster_path} rejected: {e}")
+            await _forget_file_id(poster_path)
+
+    sent = await client.send_photo(
+        chat_id=chat_id,
+        photo=photo_url,
+        caption=caption,
+        reply_markup=reply_markup,
+        parse_mode=ParseMode.HTML,
+    )
+    await _remember_file_id(poster_path, sent)
+    return sent
+
+
+async def edit_poster(
+    callback_query: CallbackQuery, photo_url: str, caption: str, reply_markup
+):
+    """Swaps the poster of a paginated card, preferring a cached file_id."""
+    poster_path = _poster_path(photo_url)
+    if file_id := await _lookup_file_id(poster_path):
+        try:
+            return await callback_query.edit_message_media(
+                media=InputMediaPhoto(
+                    media=file_id, caption=caption, parse_mode=ParseMode.HTML
+                ),
+                reply_markup=reply_markup,
+            )
+        except STALE_FILE_ID_ERRORS as e:
+            logger.warning(f"Cached file_id for {poster_path} rejected: {e}")
+            await _forget_file_id(poster_path)
+
+    edited = await callback_query.edit_message_media(
+        media=InputMediaPhoto(
+            media=photo_url, caption=caption, parse_mode=ParseMode.HTML
+        ),
+        reply_markup=reply_markup,
+    )
+    await _remember_file_id(poster_path, edited)
+    return edited
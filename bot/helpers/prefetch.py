@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from config import settings
+from bot.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Renders neighbouring pagination cards in the background under a concurrency cap."""
+
+    def __init__(self, max_concurrency: int, max_size: int = 1000, ttl: float = 300):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._results = TTLCache(max_size=max_size, ttl=ttl)
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, key: Hashable, func: Callable[[], Awaitable[Any]]):
+        """Schedules `func()` unless its result is already cached or in flight."""
+        if key in self._results or key in self._inflight:
+            return
+        task = asyncio.create_task(self._run(key, func))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+    async def _run(self, key: Hashable, func: Callable[[], Awaitable[Any]]):
+        async with self._semaphore:
+            try:
+                self._results.set(key, await func())
+            except Exception as e:
+                logger.debug(f"Prefetch for {key} failed: {e}")
+
+    async def get(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the prefetched result for `key`, falling back to `func()`."""
+        result = self._results.get(key)
+        if result is None and (task := self._inflight.get(key)):
+            await asyncio.shield(task)
+            result = self._results.get(key)
+
+        if result is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            result = await func()
+
+        logger.debug(f"Card prefetch hit rate: {self.hit_rate:.0%}")
+        return result
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "inflight": len(self._inflight),
+            "cached": len(self._results),
+        }
+
+
+card_prefetcher = Prefetcher(max_concurrency=settings.PREFETCH_CONCURRENCY)
+
+
+def prefetch_neighbours(
+    index: int,
+    total: int,
+    key: Callable[[int], Hashable],
+    render: Callable[[int], Awaitable[Any]],
+):
+    """Warms the cards on either side of `index` in a paginated list."""
+    for neighbour in (index - 1, index + 1):
+        if 0 <= neighbour < total:
+            card_prefetcher.prefetch(key(neighbour), lambda i=neighbour: render(i))
@@ -1,11 +1,306 @@
 import aiosqlite
+import asyncio
+import json
 import os
 import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from config import settings
+from bot.services.cache import TTLCache
+from bot.services.expiry import notify_deadline
 
 DB_PATH = settings.DB_PATH
 logger = logging.getLogger(__name__)
 
+# Per-connection cache of prepared statements, reused across calls
+STATEMENT_CACHE_SIZE = 256
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+# One long-lived connection for writes and one for reads. With WAL journaling
+# readers never wait on the writer, and each aiosqlite connection has its own
+# thread, so lookups don't queue behind writes.
+_writer: aiosqlite.Connection | None = None
+_reader: aiosqlite.Connection | None = None
+_write_lock = asyncio.Lock()
+
+# Linked users by Telegram ID, including "not linked" answers. Every write to
+# linked_users goes through this module and updates the cache, so the TTL is
+# only a safety net.
+_linked_users = TTLCache(max_size=settings.LINKED_USER_CACHE_MAX_SIZE, ttl=24 * 3600)
+_UNCACHED = object()
+_linked_user_writes = 0
+
+
+def _cache_linked_user(telegram_id: str, linked_user):
+    global _linked_user_writes
+    _linked_user_writes += 1
+    _linked_users.set(telegram_id, linked_user)
+
+
+async def _connect() -> aiosqlite.Connection:
+    db = await aiosqlite.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in PRAGMAS:
+        await db.execute(pragma)
+    return db
+
+
+async def _open_connections():
+    global _writer, _reader
+    if _writer is None:
+        _writer = await _connect()
+    if _reader is None:
+        _reader = await _connect()
+
+
+async def close_db():
+    """Closes the shared database connections. To be called on bot shutdown."""
+    global _writer, _reader
+    for db in (_reader, _writer):
+        if db is not None:
+            await db.close()
+    _writer = _reader = None
+
+
+@asynccontextmanager
+async def _read():
+    yield _reader
+
+
+@asynccontextmanager
+async def _write():
+    """Runs one write transaction on the shared writer connection and commits it."""
+    async with _write_lock:
+        try:
+            yield _writer
+            await _writer.commit()
+        except Exception:
+            await _writer.rollback()
+            raise
+
+
+EXPIRY_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def to_expiry_text(value: datetime | str | None) -> str | None:
+    """
+    Normalizes an expiry to fixed-width naive-UTC ISO text, so that string
+    order in SQLite matches time order and range queries can use the index.
+    Raises ValueError for strings that aren't ISO-8601.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime(EXPIRY_FORMAT)
+
+
+async def _migrate_base_schema(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS linked_users (
+            telegram_id TEXT PRIMARY KEY,
+            jellyseerr_user_id TEXT,
+            jellyfin_user_id TEXT,
+            username TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME,
+            guild_id TEXT,
+            role_name TEXT
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS poster_file_ids (
+            poster_path TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS requested_items (
+            media_type TEXT NOT NULL,
+            tmdb_id INTEGER NOT NULL,
+            requested_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (media_type, tmdb_id)
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS provisioning_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id TEXT NOT NULL,
+            telegram_username TEXT,
+            duration_days INTEGER,
+            role_name TEXT,
+            chat_id INTEGER,
+            status_message_id INTEGER,
+            state TEXT NOT NULL DEFAULT 'queued',
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_provisioning_jobs_state
+        ON provisioning_jobs (state, id)
+    """)
+
+
+async def _migrate_linked_user_indexes(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_linked_users_username
+        ON linked_users (username COLLATE NOCASE)
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_linked_users_expires_at
+        ON linked_users (expires_at) WHERE expires_at IS NOT NULL
+    """)
+
+
+async def _migrate_normalize_expires_at(db: aiosqlite.Connection):
+    async with db.execute(
+        "SELECT telegram_id, expires_at FROM linked_users WHERE expires_at IS NOT NULL"
+    ) as cursor:
+        rows = await cursor.fetchall()
+
+    updates = []
+    for telegram_id, expires_at in rows:
+        try:
+            normalized = to_expiry_text(str(expires_at))
+        except ValueError:
+            logger.warning(
+                f"Leaving unparseable expires_at for user {telegram_id}: {expires_at}"
+            )
+            continue
+        if normalized != expires_at:
+            updates.append((normalized, telegram_id))
+
+    await db.executemany(
+        "UPDATE linked_users SET expires_at=? WHERE telegram_id=?", updates
+    )
+    logger.info(f"Normalized expires_at for {len(updates)} linked users.")
+
+
+async def _migrate_requests_mirror(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS requests (
+            id INTEGER PRIMARY KEY,
+            requested_by INTEGER,
+            media_type TEXT,
+            tmdb_id INTEGER,
+            status INTEGER,
+            media_status INTEGER,
+            created_at TEXT,
+            updated_at TEXT,
+            payload TEXT NOT NULL
+        )
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_requests_requested_by
+        ON requests (requested_by, created_at DESC, id DESC)
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+
+async def _migrate_watch_stats(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS watched_items (
+            jellyfin_user_id TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            title TEXT,
+            series_name TEXT,
+            runtime_ticks INTEGER NOT NULL DEFAULT 0,
+            last_played_at TEXT,
+            PRIMARY KEY (jellyfin_user_id, item_id)
+        ) WITHOUT ROWID
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_watched_items_played
+        ON watched_items (jellyfin_user_id, last_played_at)
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS watch_stats (
+            jellyfin_user_id TEXT PRIMARY KEY,
+            watched_count INTEGER NOT NULL DEFAULT 0,
+            total_ticks INTEGER NOT NULL DEFAULT 0,
+            last_played_title TEXT,
+            last_played_at TEXT,
+            cursor TEXT,
+            refreshed_at TEXT,
+            full_refreshed_at TEXT
+        )
+    """)
+
+
+async def _migrate_leaderboard(db: aiosqlite.Connection):
+    await db.execute(
+        "ALTER TABLE watch_stats ADD COLUMN week_count INTEGER NOT NULL DEFAULT 0"
+    )
+    await db.execute(
+        "ALTER TABLE watch_stats ADD COLUMN week_ticks INTEGER NOT NULL DEFAULT 0"
+    )
+    # Ordered indexes, so top-N reads and rank counts walk the B-tree directly
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_watch_stats_total_rank
+        ON watch_stats (total_ticks DESC, watched_count DESC)
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_watch_stats_week_rank
+        ON watch_stats (week_ticks DESC, week_count DESC)
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_linked_users_jellyfin_user_id
+        ON linked_users (jellyfin_user_id)
+    """)
+
+
+# Applied in order; the database's user_version is the number already applied.
+# Only ever append to this list.
+MIGRATIONS = (
+    _migrate_base_schema,
+    _migrate_linked_user_indexes,
+    _migrate_normalize_expires_at,
+    _migrate_requests_mirror,
+    _migrate_watch_stats,
+    _migrate_leaderboard,
+)
+
+
+async def _run_migrations():
+    async with _read() as db:
+        async with db.execute("PRAGMA user_version") as cursor:
+            (current,) = await cursor.fetchone()
+
+    if current == len(MIGRATIONS):
+        logger.info(f"Database schema is up to date (version {current}).")
+        return
+    if current > len(MIGRATIONS):
+        raise RuntimeError(
+            f"Database schema version {current} is newer than this bot "
+            f"({len(MIGRATIONS)}). Refusing to start against it."
+        )
+
+    for version, migrate in enumerate(MIGRATIONS[current:], start=current + 1):
+        logger.info(f"Applying database migration {version}: {migrate.__name__}")
+        async with _write() as db:
+            # Explicit BEGIN so DDL and the version bump commit or roll back together
+            await db.execute("BEGIN")
+            await migrate(db)
+            await db.execute(f"PRAGMA user_version = {version}")
+    logger.info(f"Database schema migrated to version {len(MIGRATIONS)}.")
+
 
 async def init_db():
     """Initializes the SQLite database asynchronously."""
@@ -20,23 +315,9 @@ async def init_db():
         logger.info("Database path is in the root directory. No directory to create.")
 
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            logger.info("Database connection successful. Creating tables...")
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS linked_users (
-                    telegram_id TEXT PRIMARY KEY,
-                    jellyseerr_user_id TEXT,
-                    jellyfin_user_id TEXT,
-                    username TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    expires_at DATETIME,
-                    guild_id TEXT,
-                    role_name TEXT
-                )
-            """)
-
-            await db.commit()
-            logger.info("Database tables created/verified successfully.")
+        await _open_connections()
+        logger.info("Database connection successful. Checking schema version...")
+        await _run_migrations()
 
     except Exception as e:
         logger.error(f"CRITICAL: Failed to initialize database: {e}")
@@ -44,11 +325,11 @@ async def init_db():
 
 async def delete_linked_user(telegram_id: str):
     """Deletes a linked user from the database by their ID."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _write() as db:
         await db.execute(
             "DELETE FROM linked_users WHERE telegram_id=?", (str(telegram_id),)
         )
-        await db.commit()
+    _cache_linked_user(str(telegram_id), None)
 
 
 async def store_linked_user(
@@ -61,7 +342,8 @@ async def store_linked_user(
     role_name=None,
 ):
     """Stores or updates a linked user in the database."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    expires_at = to_expiry_text(expires_at)
+    async with _write() as db:
         await db.execute(
             """
             INSERT INTO linked_users (telegram_id, jellyseerr_user_id, jellyfin_user_id, username, expires_at, guild_id, role_name)
@@ -84,45 +366,536 @@ async def store_linked_user(
                 role_name,
             ),
         )
-        await db.commit()
+    # Mirror the TEXT affinity of the columns so cached rows match fetched ones
+    _cache_linked_user(
+        str(telegram_id),
+        (
+            _as_text(jellyseerr_user_id),
+            _as_text(jellyfin_user_id),
+            username,
+            expires_at,
+        ),
+    )
+    notify_deadline(expires_at)
+
+
+def _as_text(value):
+    return None if value is None else str(value)
 
 
 async def get_linked_user(telegram_id: str):
     """Retrieves a linked user's details by their ID."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    key = str(telegram_id)
+    linked_user = _linked_users.get(key, _UNCACHED)
+    if linked_user is not _UNCACHED:
+        return linked_user
+
+    writes_before = _linked_user_writes
+    async with _read() as db:
         async with db.execute(
             """
             SELECT jellyseerr_user_id, jellyfin_user_id, username, expires_at
             FROM linked_users WHERE telegram_id=?
         """,
-            (str(telegram_id),),
+            (key,),
         ) as cursor:
-            return await cursor.fetchone()
+            linked_user = await cursor.fetchone()
+    # Don't let a read that raced a write put the old row back in the cache
+    if writes_before == _linked_user_writes:
+        _linked_users.set(key, linked_user)
+    return linked_user
 
 
-async def get_all_expiring_users():
-    """Retrieves all IDs for users with an expiration date."""
-    async with aiosqlite.connect(DB_PATH) as db:
+def get_linked_user_cache_stats() -> dict:
+    """Hit/miss counters of the in-memory linked-user cache."""
+    return _linked_users.stats
+
+
+async def get_due_expiring_users(now: datetime):
+    """Retrieves users whose expiration date is at or before `now`."""
+    async with _read() as db:
         async with db.execute(
-            "SELECT telegram_id, jellyseerr_user_id, jellyfin_user_id, expires_at FROM linked_users WHERE expires_at IS NOT NULL"
+            "SELECT telegram_id, jellyseerr_user_id, jellyfin_user_id, expires_at FROM linked_users WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (to_expiry_text(now),),
         ) as cursor:
             return await cursor.fetchall()
 
 
+async def get_next_expiry(after: datetime | None = None):
+    """Retrieves the earliest expiration date later than `after`, or None."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT MIN(expires_at) FROM linked_users WHERE expires_at IS NOT NULL AND expires_at > ?",
+            (to_expiry_text(after) or "",),
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+
 async def get_all_linked_users():
     """Retrieves all users from the bot's database for /listusers."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _read() as db:
         async with db.execute(
-            "SELECT telegram_id, username, role_name, expires_at FROM linked_users ORDER BY created_at"
+            "SELECT telegram_id, username, role_name, expires_at, jellyfin_user_id FROM linked_users ORDER BY created_at"
         ) as cursor:
             return await cursor.fetchall()
 
 
 async def get_user_by_username(username: str):
-    """Retrieves a user's IDs by their Jellyfin/Jellyseerr username."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    """Retrieves a user's IDs by their Jellyfin/Jellyseerr username, ignoring case."""
+    async with _read() as db:
         async with db.execute(
-            "SELECT telegram_id, jellyseerr_user_id, jellyfin_user_id FROM linked_users WHERE username = ?",
+            "SELECT telegram_id, jellyseerr_user_id, jellyfin_user_id FROM linked_users WHERE username = ? COLLATE NOCASE",
             (username,),
         ) as cursor:
             return await cursor.fetchone()
+
+
+async def get_poster_file_id(poster_path: str):
+    """Retrieves the Telegram file_id previously recorded for a TMDB poster path."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT file_id FROM poster_file_ids WHERE poster_path = ?",
+            (poster_path,),
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+
+async def store_poster_file_id(poster_path: str, file_id: str):
+    """Stores or updates the Telegram file_id for a TMDB poster path."""
+    async with _write() as db:
+        await db.execute(
+            """
+            INSERT INTO poster_file_ids (poster_path, file_id) VALUES (?, ?)
+            ON CONFLICT(poster_path) DO UPDATE SET
+                file_id=excluded.file_id,
+                updated_at=CURRENT_TIMESTAMP
+        """,
+            (poster_path, file_id),
+        )
+
+
+async def delete_poster_file_id(poster_path: str):
+    """Forgets a poster file_id that Telegram no longer accepts."""
+    async with _write() as db:
+        await db.execute(
+            "DELETE FROM poster_file_ids WHERE poster_path = ?", (poster_path,)
+        )
+
+
+async def store_requested_items(items: list[tuple[str, int]]):
+    """Records (media_type, tmdb_id) pairs as requested, ignoring known ones."""
+    async with _write() as db:
+        await db.executemany(
+            "INSERT OR IGNORE INTO requested_items (media_type, tmdb_id) VALUES (?, ?)",
+            items,
+        )
+
+
+async def is_item_requested(media_type: str, tmdb_id: int) -> bool:
+    """Checks whether a (media_type, tmdb_id) pair has been requested."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT 1 FROM requested_items WHERE media_type = ? AND tmdb_id = ?",
+            (media_type, tmdb_id),
+        ) as cursor:
+            return await cursor.fetchone() is not None
+
+
+async def delete_requested_item(media_type: str, tmdb_id: int):
+    """Forgets a requested item, e.g. after its request was deleted."""
+    async with _write() as db:
+        await db.execute(
+            "DELETE FROM requested_items WHERE media_type = ? AND tmdb_id = ?",
+            (media_type, tmdb_id),
+        )
+
+
+async def enqueue_provisioning_job(
+    telegram_id,
+    telegram_username,
+    duration_days=None,
+    role_name=None,
+    chat_id=None,
+    status_message_id=None,
+) -> int:
+    """Adds an account provisioning job to the queue and returns its ID."""
+    async with _write() as db:
+        cursor = await db.execute(
+            """
+            INSERT INTO provisioning_jobs (telegram_id, telegram_username, duration_days, role_name, chat_id, status_message_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """,
+            (
+                str(telegram_id),
+                telegram_username,
+                duration_days,
+                role_name,
+                chat_id,
+                status_message_id,
+            ),
+        )
+        return cursor.lastrowid
+
+
+async def claim_provisioning_job():
+    """Atomically marks the oldest queued job as running and returns it."""
+    async with _write() as db:
+        async with db.execute(
+            """
+            UPDATE provisioning_jobs SET state='running', updated_at=CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM provisioning_jobs WHERE state='queued' ORDER BY id LIMIT 1
+            )
+            RETURNING id, telegram_id, telegram_username, duration_days, role_name, chat_id, status_message_id
+        """
+        ) as cursor:
+            job = await cursor.fetchone()
+        return job
+
+
+async def finish_provisioning_job(job_id: int, state: str, error: str = None):
+    """Records the final state of a provisioning job."""
+    async with _write() as db:
+        await db.execute(
+            "UPDATE provisioning_jobs SET state=?, error=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+            (state, error, job_id),
+        )
+
+
+async def mark_interrupted_provisioning_jobs() -> list:
+    """
+    Marks jobs left running by a previous process as interrupted and returns
+    them. They may have created accounts already, so they aren't retried.
+    """
+    async with _write() as db:
+        async with db.execute(
+            """
+            UPDATE provisioning_jobs
+            SET state='interrupted', error='Interrupted by a restart', updated_at=CURRENT_TIMESTAMP
+            WHERE state='running'
+            RETURNING id, telegram_username, chat_id, status_message_id
+        """
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def get_sync_state(name: str) -> str | None:
+    """Retrieves a stored sync cursor, e.g. the requests high-water mark."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT value FROM sync_state WHERE name = ?", (name,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+
+async def set_sync_state(name: str, value: str | None):
+    """Stores or updates a sync cursor."""
+    async with _write() as db:
+        await db.execute(
+            """
+            INSERT INTO sync_state (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value=excluded.value
+        """,
+            (name, value),
+        )
+
+
+async def get_request_statuses(request_ids: list[int]) -> dict[int, tuple]:
+    """Maps each known request ID to its stored (status, media_status)."""
+    if not request_ids:
+        return {}
+    async with _read() as db:
+        async with db.execute(
+            "SELECT id, status, media_status FROM requests WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(request_ids),),
+        ) as cursor:
+            return {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+
+
+async def store_requests(rows: list[tuple]):
+    """
+    Upserts mirrored Jellyseerr requests, given as (id, requested_by, media_type,
+    tmdb_id, status, media_status, created_at, updated_at, payload) tuples.
+    """
+    async with _write() as db:
+        await db.executemany(
+            """
+            INSERT INTO requests (id, requested_by, media_type, tmdb_id, status, media_status, created_at, updated_at, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                requested_by=excluded.requested_by,
+                media_type=excluded.media_type,
+                tmdb_id=excluded.tmdb_id,
+                status=excluded.status,
+                media_status=excluded.media_status,
+                created_at=excluded.created_at,
+                updated_at=excluded.updated_at,
+                payload=excluded.payload
+        """,
+            rows,
+        )
+
+
+async def get_unseen_request_ids(seen_ids: list[int]) -> list[int]:
+    """Lists mirrored request IDs that are not in `seen_ids`."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT id FROM requests WHERE id NOT IN (SELECT value FROM json_each(?))",
+            (json.dumps(seen_ids),),
+        ) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+
+async def delete_requests(request_ids: list[int]) -> int:
+    """Deletes mirrored requests that are no longer on Jellyseerr."""
+    if not request_ids:
+        return 0
+    async with _write() as db:
+        cursor = await db.execute(
+            "DELETE FROM requests WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(request_ids),),
+        )
+        return cursor.rowcount
+
+
+async def has_undeclined_request(media_type: str, tmdb_id: int) -> bool:
+    """Checks whether any mirrored request for a title is not declined (status 3)."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT 1 FROM requests WHERE media_type = ? AND tmdb_id = ? AND status != 3 LIMIT 1",
+            (media_type, tmdb_id),
+        ) as cursor:
+            return await cursor.fetchone() is not None
+
+
+async def count_user_requests(requested_by: int) -> int:
+    """Counts a Jellyseerr user's mirrored requests."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT COUNT(*) FROM requests WHERE requested_by = ?", (requested_by,)
+        ) as cursor:
+            (count,) = await cursor.fetchone()
+            return count
+
+
+async def get_user_request_payloads(requested_by: int, limit: int, offset: int = 0):
+    """Retrieves a page of a user's mirrored requests as JSON, newest first."""
+    async with _read() as db:
+        async with db.execute(
+            """
+            SELECT payload FROM requests WHERE requested_by = ?
+            ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+        """,
+            (requested_by, limit, offset),
+        ) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+
+async def store_watched_items(jellyfin_user_id: str, rows: list[tuple]):
+    """
+    Upserts a user's played items, given as (item_id, title, series_name,
+    runtime_ticks, last_played_at) tuples.
+    """
+    async with _write() as db:
+        await db.executemany(
+            """
+            INSERT INTO watched_items (jellyfin_user_id, item_id, title, series_name, runtime_ticks, last_played_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(jellyfin_user_id, item_id) DO UPDATE SET
+                title=excluded.title,
+                series_name=excluded.series_name,
+                runtime_ticks=excluded.runtime_ticks,
+                last_played_at=excluded.last_played_at
+        """,
+            [(jellyfin_user_id, *row) for row in rows],
+        )
+
+
+async def get_unseen_watched_item_ids(
+    jellyfin_user_id: str, seen_item_ids: list[str]
+) -> list[str]:
+    """Lists a user's stored watched item IDs that are not in `seen_item_ids`."""
+    async with _read() as db:
+        async with db.execute(
+            "SELECT item_id FROM watched_items WHERE jellyfin_user_id = ? AND item_id NOT IN (SELECT value FROM json_each(?))",
+            (jellyfin_user_id, json.dumps(seen_item_ids)),
+        ) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+
+async def finish_watch_stats_refresh(
+    jellyfin_user_id: str,
+    cursor: str | None,
+    full: bool = False,
+    drop_item_ids: list[str] | None = None,
+):
+    """
+    Recomputes a user's watch_stats row from their watched_items and moves the
+    cursor forward. A full refresh passes `drop_item_ids` for items confirmed
+    to be no longer marked played.
+    """
+    async with _write() as db:
+        if drop_item_ids:
+            await db.execute(
+                "DELETE FROM watched_items WHERE jellyfin_user_id = ? AND item_id IN (SELECT value FROM json_each(?))",
+                (jellyfin_user_id, json.dumps(drop_item_ids)),
+            )
+        await db.execute(
+            """
+            INSERT INTO watch_stats (jellyfin_user_id, watched_count, total_ticks, week_count, week_ticks, last_played_title, last_played_at, cursor, refreshed_at, full_refreshed_at)
+            SELECT ?, totals.watched_count, totals.total_ticks, week.week_count, week.week_ticks,
+                   latest.title, latest.last_played_at, ?,
+                   CURRENT_TIMESTAMP, CASE WHEN ? THEN CURRENT_TIMESTAMP END
+            FROM (
+                SELECT COUNT(*) AS watched_count, COALESCE(SUM(runtime_ticks), 0) AS total_ticks
+                FROM watched_items WHERE jellyfin_user_id = ?
+            ) AS totals
+            CROSS JOIN (
+                SELECT COUNT(*) AS week_count, COALESCE(SUM(runtime_ticks), 0) AS week_ticks
+                FROM watched_items
+                WHERE jellyfin_user_id = ?
+                  AND last_played_at >= strftime('%Y-%m-%dT%H:%M:%S', 'now', '-7 days')
+            ) AS week
+            LEFT JOIN (
+                SELECT title, last_played_at FROM watched_items
+                WHERE jellyfin_user_id = ? ORDER BY last_played_at DESC LIMIT 1
+            ) AS latest
+            WHERE true
+            ON CONFLICT(jellyfin_user_id) DO UPDATE SET
+                watched_count=excluded.watched_count,
+                total_ticks=excluded.total_ticks,
+                week_count=excluded.week_count,
+                week_ticks=excluded.week_ticks,
+                last_played_title=excluded.last_played_title,
+                last_played_at=excluded.last_played_at,
+                cursor=COALESCE(excluded.cursor, watch_stats.cursor),
+                refreshed_at=excluded.refreshed_at,
+                full_refreshed_at=COALESCE(excluded.full_refreshed_at, watch_stats.full_refreshed_at)
+        """,
+            (
+                jellyfin_user_id,
+                cursor,
+                full,
+                jellyfin_user_id,
+                jellyfin_user_id,
+                jellyfin_user_id,
+            ),
+        )
+
+
+async def get_watch_stats(jellyfin_user_id: str):
+    """
+    Retrieves a user's materialized watch stats as (watched_count, total_ticks,
+    last_played_title, last_played_at, cursor, refreshed_at, full_refreshed_at).
+    """
+    async with _read() as db:
+        async with db.execute(
+            """
+            SELECT watched_count, total_ticks, last_played_title, last_played_at, cursor, refreshed_at, full_refreshed_at
+            FROM watch_stats WHERE jellyfin_user_id = ?
+        """,
+            (jellyfin_user_id,),
+        ) as cursor:
+            return await cursor.fetchone()
+
+
+async def get_weekly_watch_ticks(jellyfin_user_id: str, weeks: int):
+    """Sums a user's runtime per week over the last `weeks` weeks, by last play."""
+    async with _read() as db:
+        async with db.execute(
+            """
+            SELECT CAST((julianday('now') - julianday(last_played_at)) / 7 AS INTEGER) AS weeks_ago,
+                   SUM(runtime_ticks)
+            FROM watched_items
+            WHERE jellyfin_user_id = ? AND last_played_at >= strftime('%Y-%m-%dT%H:%M:%S', 'now', ?)
+            GROUP BY weeks_ago ORDER BY weeks_ago
+        """,
+            (jellyfin_user_id, f"-{weeks * 7} days"),
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def get_top_series(jellyfin_user_id: str, limit: int):
+    """Retrieves a user's most watched series as (series_name, episodes, ticks)."""
+    async with _read() as db:
+        async with db.execute(
+            """
+            SELECT series_name, COUNT(*), SUM(runtime_ticks) AS ticks
+            FROM watched_items
+            WHERE jellyfin_user_id = ? AND series_name IS NOT NULL
+            GROUP BY series_name ORDER BY ticks DESC LIMIT ?
+        """,
+            (jellyfin_user_id, limit),
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def prune_watch_stats(keep_jellyfin_user_ids: list[str]) -> int:
+    """Drops watch stats of Jellyfin users that are no longer linked."""
+    keep = json.dumps(keep_jellyfin_user_ids)
+    async with _write() as db:
+        await db.execute(
+            "DELETE FROM watched_items WHERE jellyfin_user_id NOT IN (SELECT value FROM json_each(?))",
+            (keep,),
+        )
+        cursor = await db.execute(
+            "DELETE FROM watch_stats WHERE jellyfin_user_id NOT IN (SELECT value FROM json_each(?))",
+            (keep,),
+        )
+        return cursor.rowcount
+
+
+# Leaderboard periods mapped to their (ticks, count) columns in watch_stats
+_LEADERBOARD_COLUMNS = {
+    "week": ("week_ticks", "week_count"),
+    "all": ("total_ticks", "watched_count"),
+}
+
+
+async def get_leaderboard(period: str, limit: int):
+    """
+    Retrieves the top `limit` users for a leaderboard period ("week" or "all")
+    as (jellyfin_user_id, username, ticks, count), best first. A Jellyfin user
+    linked from several Telegram accounts is listed once.
+    """
+    ticks, count = _LEADERBOARD_COLUMNS[period]
+    async with _read() as db:
+        async with db.execute(
+            f"""
+            SELECT w.jellyfin_user_id,
+                (SELECT l.username FROM linked_users AS l
+                 WHERE l.jellyfin_user_id = w.jellyfin_user_id LIMIT 1),
+                w.{ticks}, w.{count}
+            FROM watch_stats AS w
+            WHERE w.{ticks} > 0
+            ORDER BY w.{ticks} DESC, w.{count} DESC
+            LIMIT ?
+        """,
+            (limit,),
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def get_leaderboard_rank(period: str, jellyfin_user_id: str):
+    """
+    Retrieves a user's (rank, ticks, count) for a leaderboard period, or None
+    if they have no watch time in it. Users ahead are counted off the index.
+    """
+    ticks, count = _LEADERBOARD_COLUMNS[period]
+    async with _read() as db:
+        async with db.execute(
+            f"""
+            SELECT
+                (SELECT COUNT(*) FROM watch_stats AS other
+                 WHERE other.{ticks} > me.{ticks}
+                    OR (other.{ticks} = me.{ticks} AND other.{count} > me.{count})) + 1,
+                me.{ticks}, me.{count}
+            FROM watch_stats AS me
+            WHERE me.jellyfin_user_id = ? AND me.{ticks} > 0
+        """,
+            (jellyfin_user_id,),
+        ) as cursor:
+            return await cursor.fetchone()
@@ -0,0 +1,88 @@
+import asyncio
+import httpx
+import logging
+import time
+
+from config import settings
+from bot.services.http_clients import BACKGROUND_TIMEOUT, jellyseerr_client
+from bot.services.cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DISCOVER_ENDPOINTS = ("movies", "tv")
+
+_snapshot: list[dict] = []
+_refreshed_at: float | None = None
+_refresh_flight = SingleFlight()
+# Held so a background refresh isn't garbage collected mid-flight
+_background_refresh: asyncio.Task | None = None
+
+
+async def _fetch_discover_page(endpoint: str, page: int) -> list[dict]:
+    response = await jellyseerr_client.get(
+        f"/api/v1/discover/{endpoint}",
+        params={"page": page},
+        timeout=BACKGROUND_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+
+async def _refresh() -> list[dict]:
+    global _snapshot, _refreshed_at
+
+    pages = range(1, settings.DISCOVER_PAGES + 1)
+    jobs = [
+        _fetch_discover_page(endpoint, page)
+        for endpoint in DISCOVER_ENDPOINTS
+        for page in pages
+    ]
+    try:
+        # Results come back in job order: all movie pages, then all TV pages
+        page_results = await asyncio.gather(*jobs)
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
+        logger.error(f"Error refreshing discover feed, keeping last snapshot: {e}")
+        return _snapshot
+
+    results = []
+    seen = set()
+    for page in page_results:
+        for item in page:
+            key = (item.get("mediaType"), item.get("id"))
+            if key not in seen:
+                seen.add(key)
+                results.append(item)
+
+    if results:
+        _snapshot = results
+        _refreshed_at = time.monotonic()
+        logger.info(f"Discover feed refreshed with {len(results)} items.")
+    return _snapshot
+
+
+async def refresh_discover_feed() -> list[dict]:
+    """Fetches every discover endpoint/page concurrently and swaps in the result."""
+    return await _refresh_flight.do("discover", _refresh)
+
+
+async def get_discover_feed() -> list[dict]:
+    """
+    Returns the last good discover snapshot immediately.
+    A stale snapshot triggers a background refresh; only a cold start waits.
+    """
+    if not _snapshot:
+        return await refresh_discover_feed()
+
+    global _background_refresh
+    age = time.monotonic() - _refreshed_at
+    if age >= settings.DISCOVER_REFRESH_INTERVAL_SECONDS and (
+        _background_refresh is None or _background_refresh.done()
+    ):
+        _background_refresh = asyncio.create_task(refresh_discover_feed())
+        _background_refresh.add_done_callback(_log_failure)
+    return _snapshot
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and (e := task.exception()):
+        logger.error(f"Background discover refresh failed: {e}")
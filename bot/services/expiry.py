@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# State shared between store_linked_user and the expiry scheduler in tasks.py
+_wakeup = asyncio.Event()
+_sleeping_until: datetime | None = None
+
+
+def notify_deadline(expires_at: datetime | str | None):
+    """Wakes the expiry scheduler if `expires_at` is earlier than its next deadline."""
+    if not expires_at:
+        return
+    if isinstance(expires_at, str):
+        try:
+            expires_at = datetime.fromisoformat(expires_at)
+        except ValueError:
+            return
+
+    if _sleeping_until is None or expires_at < _sleeping_until:
+        _wakeup.set()
+
+
+def begin_pass():
+    """Marks the start of a scheduler pass; deadlines written from now on wake it."""
+    _wakeup.clear()
+
+
+async def sleep_until(deadline: datetime | None):
+    """Sleeps until `deadline` (forever if None) or until an earlier one is written."""
+    global _sleeping_until
+    timeout = None
+    if deadline is not None:
+        timeout = max(0.0, (deadline - datetime.utcnow()).total_seconds())
+        logger.info(f"Next user expiry at {deadline.isoformat()} UTC.")
+
+    _sleeping_until = deadline
+    try:
+        await asyncio.wait_for(_wakeup.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        _sleeping_until = None
@@ -1,7 +1,11 @@
+import asyncio
 import httpx
+import logging
 from config import settings
 
-http_client = httpx.AsyncClient(timeout=15.0)
+logger = logging.getLogger(__name__)
+
+TMDB_IMAGE_HOST = "https://image.tmdb.org"
 
 jellyseerr_headers = {
     "X-Api-Key": settings.JELLYSEERR_API_KEY,
@@ -13,7 +17,90 @@ jellyfin_headers = {
     "Content-Type": "application/json",
 }
 
+# Timeouts per kind of operation. Interactive calls fail fast so the user gets
+# an answer; background sweeps page through long lists and get more room.
+INTERACTIVE_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+BACKGROUND_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+IMAGE_TIMEOUT = httpx.Timeout(5.0)
+WARM_UP_TIMEOUT = httpx.Timeout(5.0)
+
+
+def _http2_enabled() -> bool:
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning(
+            "HTTP2_ENABLED is set but the 'h2' package is not installed. "
+            "Falling back to HTTP/1.1 (pip install 'httpx[http2]')."
+        )
+        return False
+    return True
+
+
+# Checked once, so a missing h2 package is reported once rather than per client
+_HTTP2 = _http2_enabled()
+
+
+def _create_client(
+    base_url: str,
+    headers: dict,
+    max_connections: int,
+    timeout: httpx.Timeout = INTERACTIVE_TIMEOUT,
+) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        http2=_HTTP2,
+    )
+
+
+# One client per upstream, each with its own connection pool, so a slow
+# Jellyfin can't hold the connections that Jellyseerr searches need
+jellyseerr_client = _create_client(
+    settings.JELLYSEERR_URL, jellyseerr_headers, settings.JELLYSEERR_MAX_CONNECTIONS
+)
+jellyfin_client = _create_client(
+    settings.JELLYFIN_URL, jellyfin_headers, settings.JELLYFIN_MAX_CONNECTIONS
+)
+tmdb_image_client = _create_client(
+    TMDB_IMAGE_HOST, {}, settings.TMDB_MAX_CONNECTIONS, timeout=IMAGE_TIMEOUT
+)
+
+_CLIENTS = (jellyseerr_client, jellyfin_client, tmdb_image_client)
+
+# Cheap unauthenticated endpoints used to open a connection to each upstream
+_WARM_UP_PROBES = (
+    (jellyseerr_client, "/api/v1/status"),
+    (jellyfin_client, "/System/Info/Public"),
+    (tmdb_image_client, "/"),
+)
+
+
+async def warm_up_http_clients():
+    """
+    Opens a keep-alive connection to each upstream, so the first user request
+    after startup doesn't pay for DNS, TCP and TLS setup. Failures are only
+    logged; the clients connect lazily as usual.
+    """
+
+    async def probe(client: httpx.AsyncClient, path: str):
+        try:
+            await client.head(path, timeout=WARM_UP_TIMEOUT)
+        except httpx.RequestError as e:
+            logger.warning(f"Could not pre-connect to {client.base_url}: {e}")
+
+    await asyncio.gather(*(probe(client, path) for client, path in _WARM_UP_PROBES))
+    logger.info("HTTP clients warmed up.")
+
 
-async def close_http_client():
+async def close_http_clients():
     """To be called on bot shutdown."""
-    await http_client.aclose()
+    await asyncio.gather(*(client.aclose() for client in _CLIENTS))
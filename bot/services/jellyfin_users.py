@@ -0,0 +1,59 @@
+import logging
+
+from config import settings
+from bot.services.http_clients import jellyfin_client
+from bot.services.cache import SingleFlight, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# One snapshot of /Users with lookup indexes, shared by all admin commands
+_index = TTLCache(max_size=1, ttl=settings.JELLYFIN_USERS_TTL_SECONDS)
+_flight = SingleFlight()
+# Bumped on every invalidation, so a fetch that started before it is not cached
+_generation = 0
+
+
+async def _fetch_index(generation: int) -> dict:
+    response = await jellyfin_client.get("/Users")
+    response.raise_for_status()
+    users = response.json()
+    index = {
+        "users": users,
+        "by_name": {u.get("Name", "").casefold(): u for u in users},
+        "by_id": {u.get("Id"): u for u in users},
+    }
+    if generation == _generation:
+        _index.set("users", index)
+    logger.info(f"Indexed {len(users)} Jellyfin users.")
+    return index
+
+
+async def _get_index() -> dict:
+    index = _index.get("users")
+    if index is None:
+        # Keyed by generation, so callers arriving after an invalidation
+        # don't join a fetch that may predate the change
+        generation = _generation
+        index = await _flight.do(generation, lambda: _fetch_index(generation))
+    return index
+
+
+async def get_jellyfin_users() -> list[dict]:
+    """Returns every Jellyfin user. Raises the underlying httpx error on failure."""
+    return (await _get_index())["users"]
+
+
+async def find_jellyfin_user_by_name(name: str) -> dict | None:
+    """Looks up a Jellyfin user by name, ignoring case."""
+    return (await _get_index())["by_name"].get(name.casefold())
+
+
+async def find_jellyfin_user_by_id(user_id: str) -> dict | None:
+    return (await _get_index())["by_id"].get(user_id)
+
+
+def invalidate_jellyfin_users():
+    """Drops the snapshot after users are created or deleted through the bot."""
+    global _generation
+    _generation += 1
+    _index.pop("users")
@@ -0,0 +1,165 @@
+import httpx
+import logging
+
+from bot.services.http_clients import (
+    BACKGROUND_TIMEOUT,
+    INTERACTIVE_TIMEOUT,
+    jellyseerr_client,
+)
+from bot.services.cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+
+# Indexes over every Jellyseerr user, kept in sync by refresh_user_directory()
+_by_jellyfin_id: dict[str, dict] = {}
+_by_id: dict[int, dict] = {}
+_updated_high_water: str | None = None
+_refresh_flight = SingleFlight()
+# Changes made while a full sweep is running, replayed once it swaps in
+_sweep_log: list[tuple[str, object]] | None = None
+
+
+def remember_user(user: dict):
+    """Adds or replaces a Jellyseerr user in the directory."""
+    global _updated_high_water
+    if _sweep_log is not None:
+        _sweep_log.append(("remember", user))
+    _by_id[user["id"]] = user
+    if jellyfin_user_id := user.get("jellyfinUserId"):
+        _by_jellyfin_id[str(jellyfin_user_id)] = user
+    updated_at = user.get("updatedAt")
+    if updated_at and (not _updated_high_water or updated_at > _updated_high_water):
+        _updated_high_water = updated_at
+
+
+def forget_user(user_id):
+    """Drops a deleted Jellyseerr user from the directory."""
+    if _sweep_log is not None:
+        _sweep_log.append(("forget", user_id))
+    user = _by_id.pop(int(user_id), None)
+    if user and user.get("jellyfinUserId"):
+        _by_jellyfin_id.pop(str(user["jellyfinUserId"]), None)
+
+
+async def _fetch_page(
+    skip: int, sort: str = "updated", timeout: httpx.Timeout = BACKGROUND_TIMEOUT
+) -> list[dict]:
+    response = await jellyseerr_client.get(
+        "/api/v1/user",
+        params={"take": PAGE_SIZE, "skip": skip, "sort": sort},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+
+async def _fetch_user(user_id: int) -> dict | None:
+    """Fetches a single user, or None if Jellyseerr doesn't have them."""
+    try:
+        response = await jellyseerr_client.get(
+            f"/api/v1/user/{user_id}", timeout=INTERACTIVE_TIMEOUT
+        )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return None
+        raise
+    return response.json()
+
+
+async def _sweep():
+    """Re-reads every user and swaps in freshly built indexes."""
+    global _by_jellyfin_id, _by_id, _updated_high_water, _sweep_log
+    sweep_log = _sweep_log = []
+    try:
+        users = []
+        skip = 0
+        while True:
+            page = await _fetch_page(skip)
+            users.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            skip += PAGE_SIZE
+    finally:
+        _sweep_log = None
+
+    # Swap only once the sweep has completed, then replay whatever was
+    # remembered or forgotten meanwhile, so those changes aren't lost
+    _by_jellyfin_id, _by_id, _updated_high_water = {}, {}, None
+    for user in users:
+        remember_user(user)
+    for action, value in sweep_log:
+        if action == "remember":
+            remember_user(value)
+        else:
+            forget_user(value)
+    logger.info(f"User directory indexed {len(users)} Jellyseerr users.")
+
+
+async def _refresh_recent():
+    since = _updated_high_water
+
+    changed = 0
+    skip = 0
+    while True:
+        page = await _fetch_page(skip)
+        # Pages are newest-updated first, so stop once we reach known state.
+        # Users at the cursor itself are fetched again, since another update
+        # may share its timestamp; remembering them twice is harmless.
+        fresh = [u for u in page if not since or (u.get("updatedAt") or "") >= since]
+        for user in fresh:
+            if _by_id.get(user["id"]) != user:
+                changed += 1
+            remember_user(user)
+
+        if len(fresh) < len(page) or len(page) < PAGE_SIZE:
+            break
+        skip += PAGE_SIZE
+
+    if changed:
+        logger.info(f"User directory picked up {changed} updated users.")
+
+
+async def refresh_user_directory(full: bool = False):
+    """
+    Pages through Jellyseerr users, most recently updated first.
+    An incremental refresh stops at the last update already indexed; a full
+    one rebuilds the indexes, dropping users deleted on Jellyseerr.
+    """
+    if not _by_id:
+        full = True
+    await _refresh_flight.do(full, _sweep if full else _refresh_recent)
+
+
+async def _lookup_newest():
+    """Remembers the most recently created users, where a new account shows up."""
+    # Only runs on a miss in an interactive lookup such as /link
+    for user in await _fetch_page(0, sort="created", timeout=INTERACTIVE_TIMEOUT):
+        remember_user(user)
+
+
+async def find_by_jellyfin_id(jellyfin_user_id) -> dict | None:
+    """
+    Returns the Jellyseerr user linked to a Jellyfin user ID.
+    Jellyseerr can't filter users by Jellyfin ID, so a miss fetches a single
+    page of the newest users, which is where a just-imported account is.
+    """
+    key = str(jellyfin_user_id)
+    if user := _by_jellyfin_id.get(key):
+        return user
+    if not _by_id:
+        await refresh_user_directory(full=True)
+    else:
+        await _refresh_flight.do("newest", _lookup_newest)
+    return _by_jellyfin_id.get(key)
+
+
+async def find_by_id(user_id) -> dict | None:
+    user_id = int(user_id)
+    if user := _by_id.get(user_id):
+        return user
+    if user := await _fetch_user(user_id):
+        remember_user(user)
+    return user
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from config import settings
+from bot.services.http_clients import jellyseerr_client
+from bot.services.cache import SingleFlight, TTLCache
+
+logger = logging.getLogger(__name__)
+
+WARM_CONCURRENCY = 4
+
+_details_cache = TTLCache(
+    max_size=settings.MEDIA_DETAILS_CACHE_MAX_SIZE,
+    ttl=settings.MEDIA_DETAILS_CACHE_TTL_SECONDS,
+)
+_flights = SingleFlight()
+
+
+def _cache_key(media_type: str, tmdb_id) -> tuple[str, int]:
+    return ("tv" if media_type == "tv" else "movie", int(tmdb_id))
+
+
+async def _fetch_media_details(key: tuple[str, int]) -> dict:
+    endpoint, tmdb_id = key
+    response = await jellyseerr_client.get(f"/api/v1/{endpoint}/{tmdb_id}")
+    response.raise_for_status()
+    details = response.json()
+    _details_cache.set(key, details)
+    return details
+
+
+async def get_media_details(media_type: str, tmdb_id) -> dict:
+    """
+    Returns Jellyseerr's details for a movie or show, shared across all users.
+    Raises the underlying httpx error if the upstream call fails.
+    """
+    key = _cache_key(media_type, tmdb_id)
+    details = _details_cache.get(key)
+    if details is not None:
+        return details
+    return await _flights.do(key, lambda: _fetch_media_details(key))
+
+
+async def warm_media_details(items: list[tuple[str, int]]):
+    """Fetches details for every (media_type, tmdb_id) not already cached."""
+    keys = {_cache_key(media_type, tmdb_id) for media_type, tmdb_id in items if tmdb_id}
+    missing = [key for key in keys if key not in _details_cache]
+    if not missing:
+        return
+
+    semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+
+    async def warm(key):
+        async with semaphore:
+            try:
+                await _flights.do(key, lambda: _fetch_media_details(key))
+            except Exception as e:
+                logger.debug(f"Failed to warm media details for {key}: {e}")
+
+    await asyncio.gather(*(warm(key) for key in missing))
+    logger.info(f"Warmed media details for {len(missing)} items.")
+
+
+def invalidate_media_details(media_type: str, tmdb_id):
+    _details_cache.pop(_cache_key(media_type, tmdb_id))
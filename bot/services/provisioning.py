@@ -0,0 +1,324 @@
+import httpx
+import re
+import secrets
+import logging
+import html
+import asyncio
+from datetime import datetime, timedelta
+from pyrogram import Client
+from pyrogram.enums import ParseMode
+
+from config import settings
+from bot.services.http_clients import jellyfin_client, jellyseerr_client
+from bot.services.jellyfin_users import (
+    find_jellyfin_user_by_name,
+    invalidate_jellyfin_users,
+)
+from bot.helpers.polling import wait_until_visible
+from bot.services.jellyseerr_users import find_by_jellyfin_id, remember_user
+from bot.services.database import (
+    store_linked_user,
+    enqueue_provisioning_job,
+    claim_provisioning_job,
+    finish_provisioning_job,
+    mark_interrupted_provisioning_jobs,
+)
+
+logger = logging.getLogger(__name__)
+
+_wakeup = asyncio.Event()
+_workers: list[asyncio.Task] = []
+
+
+class ProvisioningError(Exception):
+    """A handled provisioning failure; the admin has already been told why."""
+
+
+class StatusMessage:
+    """Edits an admin's status message by ID, so jobs don't hold Message objects."""
+
+    def __init__(self, client: Client, chat_id: int, message_id: int):
+        self.client = client
+        self.chat_id = chat_id
+        self.message_id = message_id
+
+    async def edit(self, text: str):
+        try:
+            await self.client.edit_message_text(self.chat_id, self.message_id, text)
+        except Exception as e:
+            logger.warning(f"Failed to update provisioning status message: {e}")
+
+
+async def provision_user(
+    app_client: Client,
+    reply_message: StatusMessage,
+    telegram_user_id: int,
+    telegram_username: str,
+    duration_days: int = None,
+    role_name_to_assign: str = None,
+):
+    jellyfin_url = settings.JELLYFIN_URL
+    jellyseerr_url = settings.JELLYSEERR_URL
+
+    username = re.sub(r"[^a-zA-Z0-9.-]", "", telegram_username)
+    if not username:
+        username = f"tg_user_{telegram_user_id}"
+
+    temp_password = secrets.token_urlsafe(12)
+    jellyfin_user_id = None
+    jellyfin_user_created = False
+
+    try:
+        existing_user = await find_jellyfin_user_by_name(username)
+
+        if existing_user:
+            await reply_message.edit(
+                f"⚠️ **User Already Exists!**\n"
+                f"User '{html.escape(username)}' (ID: `{existing_user.get('Id')}`) already exists in Jellyfin."
+            )
+            raise ProvisioningError(f"Jellyfin user {username} already exists")
+
+    except httpx.HTTPStatusError as e:
+        await reply_message.edit(
+            f"❌ Failed to check for existing users (HTTP {e.response.status_code}): {e.response.text}"
+        )
+        raise ProvisioningError(
+            f"Existing user check failed (HTTP {e.response.status_code})"
+        )
+    except httpx.RequestError as e:
+        await reply_message.edit(
+            f"❌ Failed to check for existing users (Network Error): {e}"
+        )
+        raise ProvisioningError(f"Existing user check failed: {e}")
+
+    # 1. Create Jellyfin User
+    await reply_message.edit(f"⚙️ Creating Jellyfin account for `{username}`...")
+    try:
+        jellyfin_user_payload = {
+            "Name": username,
+            "Password": temp_password,
+            "Policy": {
+                "IsAdministrator": False,
+                "EnableUserPreferenceAccess": True,
+                "EnableMediaPlayback": True,
+                "EnableLiveTvAccess": False,
+                "EnableLiveTvManagement": False,
+            },
+        }
+        response_fin = await jellyfin_client.post(
+            "/Users/New", json=jellyfin_user_payload
+        )
+
+        response_fin.raise_for_status()
+
+        jellyfin_user_id = response_fin.json().get("Id")
+        jellyfin_user_created = True
+        invalidate_jellyfin_users()
+
+    except httpx.HTTPStatusError as e:
+        await reply_message.edit(
+            f"❌ Failed to create Jellyfin user (HTTP {e.response.status_code}): {e.response.text}"
+        )
+        raise ProvisioningError(
+            f"Jellyfin user creation failed (HTTP {e.response.status_code})"
+        )
+    except httpx.RequestError as e:
+        await reply_message.edit(
+            f"❌ Failed to create Jellyfin user (Network Error): {e}"
+        )
+        raise ProvisioningError(f"Jellyfin user creation failed: {e}")
+
+    if not jellyfin_user_id:
+        await reply_message.edit("❌ Failed to get Jellyfin User ID after creation.")
+        raise ProvisioningError("Jellyfin returned no user ID")
+
+    # 2. Import User to Jellyseerr
+    await reply_message.edit(f"⚙️ Importing `{username}` into Jellyseerr...")
+    jellyseerr_user = None
+    try:
+        response_seerr_import = await jellyseerr_client.post(
+            "/api/v1/user/import-from-jellyfin",
+            json={"jellyfinUserIds": [jellyfin_user_id]},
+        )
+        response_seerr_import.raise_for_status()
+        jellyseerr_user = response_seerr_import.json()[0]
+        remember_user(jellyseerr_user)
+
+    except (httpx.HTTPStatusError, httpx.RequestError) as e:
+        logger.warning(
+            f"Failed to auto-import {username} to Jellyseerr: {e}. Trying to find them..."
+        )
+
+        try:
+            # Jellyseerr may still be indexing the user, so poll until it shows up
+            jellyseerr_user = await wait_until_visible(
+                lambda: find_by_jellyfin_id(jellyfin_user_id),
+                timeout=settings.JELLYSEERR_IMPORT_TIMEOUT_SECONDS,
+            )
+            if not jellyseerr_user:
+                raise Exception("User not found in Jellyseerr after failed import.")
+
+        except (httpx.HTTPStatusError, httpx.RequestError, Exception) as search_e:
+            logger.error(f"Failed to find user in Jellyseerr: {search_e}")
+            # Rollback: Delete the Jellyfin user we just created
+            if jellyfin_user_created:
+                await jellyfin_client.delete(f"/Users/{jellyfin_user_id}")
+                invalidate_jellyfin_users()
+            await reply_message.edit(
+                f"❌ Failed to import/find in Jellyseerr ({e}). Rolled back Jellyfin user creation."
+            )
+            raise ProvisioningError(f"Jellyseerr import failed: {e}")
+
+    if role_name_to_assign:
+        logger.info(f"User {username} assigned virtual role '{role_name_to_assign}'.")
+
+    # 4. Store linked user
+    expires_at = (
+        datetime.utcnow() + timedelta(days=duration_days) if duration_days else None
+    )
+    await store_linked_user(
+        telegram_id=str(telegram_user_id),
+        jellyseerr_user_id=str(jellyseerr_user.get("id")),
+        jellyfin_user_id=str(jellyfin_user_id),
+        username=username,
+        expires_at=expires_at.isoformat() if expires_at else None,
+        guild_id=None,
+        role_name=role_name_to_assign,
+    )
+
+    # 5. DM Credentials
+    try:
+        dm_message = (
+            f"## Welcome to the Media Server! 🎉\n\n"
+            f"An account has been created for you. Here are your login details:\n\n"
+            f"**Username:** `{username}`\n"
+            f"**Temporary Password:** `{temp_password}`\n\n"
+            f"Please change your password after logging in.\n\n"
+            f"🔗 Jellyfin: {jellyfin_url}\n"
+            f"🔗 Jellyseerr: {jellyseerr_url}\n\n"
+        )
+        if duration_days:
+            dm_message += f"**Note:** This is a temporary account that will expire in {duration_days} days."
+
+        await app_client.send_message(
+            chat_id=telegram_user_id, text=dm_message, parse_mode=ParseMode.MARKDOWN
+        )
+        await reply_message.edit(
+            f"✅ Successfully created account for `{username}` and sent them a DM."
+        )
+    except Exception as e:
+        logger.warning(f"Failed to DM user {telegram_user_id}: {e}")
+        await reply_message.edit(
+            f"✅ Account for {username} created, but I could not DM them.\nPassword: `{temp_password}`"
+        )
+
+
+async def enqueue_invite(
+    status_message,
+    telegram_user_id: int,
+    telegram_username: str,
+    duration_days: int = None,
+    role_name: str = None,
+) -> int:
+    """
+    Queues an account for background provisioning.
+    Progress is reported by editing `status_message`.
+    """
+    job_id = await enqueue_provisioning_job(
+        telegram_id=str(telegram_user_id),
+        telegram_username=telegram_username,
+        duration_days=duration_days,
+        role_name=role_name,
+        chat_id=status_message.chat.id,
+        status_message_id=status_message.id,
+    )
+    _wakeup.set()
+    return job_id
+
+
+async def _run_job(client: Client, job):
+    (
+        job_id,
+        telegram_id,
+        telegram_username,
+        duration_days,
+        role_name,
+        chat_id,
+        status_message_id,
+    ) = job
+    status = StatusMessage(client, chat_id, status_message_id)
+    try:
+        await provision_user(
+            client,
+            status,
+            int(telegram_id),
+            telegram_username,
+            duration_days,
+            role_name,
+        )
+        state, error = "done", None
+    except ProvisioningError as e:
+        logger.warning(f"Provisioning job {job_id} failed: {e}")
+        state, error = "failed", str(e)
+    except Exception as e:
+        logger.error(f"Provisioning job {job_id} failed unexpectedly: {e}")
+        state, error = "failed", str(e)
+        await status.edit(f"❌ An unexpected error occurred: {e}")
+
+    # A failure here must not take the worker down with it
+    try:
+        await finish_provisioning_job(job_id, state, error)
+    except Exception as e:
+        logger.error(f"Failed to record provisioning job {job_id} as {state}: {e}")
+
+
+async def _worker(client: Client, worker_id: int):
+    while True:
+        # Clear before claiming so an enqueue during the claim still wakes us
+        _wakeup.clear()
+        try:
+            job = await claim_provisioning_job()
+        except Exception as e:
+            logger.error(f"Provisioning worker {worker_id} failed to claim a job: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        logger.info(f"Provisioning worker {worker_id} picked up job {job[0]}.")
+        await _run_job(client, job)
+
+
+async def start_provisioning_workers(client: Client):
+    """
+    Flags jobs interrupted by a restart and starts the worker pool.
+    Interrupted jobs may have left a partial account behind, so they are not
+    re-run; their admins are told to check and re-invite instead.
+    """
+    for (
+        job_id,
+        telegram_username,
+        chat_id,
+        status_message_id,
+    ) in await mark_interrupted_provisioning_jobs():
+        logger.warning(
+            f"Provisioning job {job_id} for {telegram_username} was interrupted."
+        )
+        await StatusMessage(client, chat_id, status_message_id).edit(
+            f"⚠️ Provisioning for `{telegram_username}` was interrupted by a restart.\n"
+            f"Check Jellyfin and Jellyseerr for a partial account before inviting them again."
+        )
+
+    for worker_id in range(settings.PROVISIONING_WORKERS):
+        _workers.append(asyncio.create_task(_worker(client, worker_id)))
+    logger.info(f"Started {settings.PROVISIONING_WORKERS} provisioning workers.")
+
+
+async def stop_provisioning_workers():
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
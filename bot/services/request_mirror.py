@@ -0,0 +1,209 @@
+import asyncio
+import httpx
+import json
+import logging
+
+from bot.services.http_clients import BACKGROUND_TIMEOUT, jellyseerr_client
+from bot.services.cache import SingleFlight
+from bot.services.database import (
+    get_sync_state,
+    set_sync_state,
+    get_request_statuses,
+    store_requests,
+    get_unseen_request_ids,
+    delete_requests,
+    has_undeclined_request,
+)
+from bot.services.media_details import invalidate_media_details
+from bot.services.requested_items import mark_requested_many, unmark_requested
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+CURSOR_NAME = "requests_updated_at"
+REQUEST_STATUS_DECLINED = 3
+
+_sync_flight = SingleFlight()
+# Full and incremental syncs both write the cursor, so they never overlap
+_sync_lock = asyncio.Lock()
+_synced = False
+# Bumped whenever the mirror changes, so cached request cards can't go stale
+_version = 0
+
+
+async def _fetch_page(skip: int) -> list[dict]:
+    response = await jellyseerr_client.get(
+        "/api/v1/request",
+        params={"take": PAGE_SIZE, "skip": skip, "filter": "all", "sort": "modified"},
+        timeout=BACKGROUND_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+
+async def _fetch_request(request_id: int) -> dict | None:
+    """Fetches a single request, or None if Jellyseerr no longer has it."""
+    try:
+        response = await jellyseerr_client.get(
+            f"/api/v1/request/{request_id}", timeout=BACKGROUND_TIMEOUT
+        )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return None
+        raise
+    return response.json()
+
+
+def _to_row(request: dict) -> tuple:
+    media = request.get("media") or {}
+    return (
+        request["id"],
+        (request.get("requestedBy") or {}).get("id"),
+        media.get("mediaType"),
+        media.get("tmdbId"),
+        request.get("status"),
+        media.get("status"),
+        request.get("createdAt"),
+        request.get("updatedAt"),
+        json.dumps(request),
+    )
+
+
+async def _apply_page(page: list[dict]) -> list[tuple[dict, tuple | None]]:
+    """Stores one page of requests and returns those whose status changed."""
+    rows = [_to_row(r) for r in page if r.get("id") is not None]
+    known = await get_request_statuses([row[0] for row in rows])
+    await store_requests(rows)
+
+    changes = []
+    for request, row in zip(page, rows):
+        previous = known.get(row[0])
+        if previous != (row[4], row[5]):
+            changes.append((request, previous))
+    return changes
+
+
+async def _on_changes(changes: list[tuple[dict, tuple | None]]):
+    """Propagates request status changes to the caches that depend on them."""
+    requested, declined = [], []
+    for request, _ in changes:
+        media = request.get("media") or {}
+        key = (media.get("mediaType"), media.get("tmdbId"))
+        if not all(key):
+            continue
+        invalidate_media_details(*key)
+        if request.get("status") == REQUEST_STATUS_DECLINED:
+            declined.append(key)
+        else:
+            requested.append(key)
+
+    await mark_requested_many(requested)
+    for key in declined:
+        # Another user's request for the same title keeps it marked
+        if not await has_undeclined_request(*key):
+            await unmark_requested(*key)
+
+
+async def _confirm_unseen(seen_ids: list[int]):
+    """
+    Checks mirrored requests that a full sweep didn't see. Paging by offset
+    can skip a request when others are modified or deleted mid-sweep, so each
+    one is looked up on its own and only deleted if Jellyseerr confirms it's
+    gone. Returns the changes picked up along the way and the deleted count.
+    """
+    changes, gone = [], []
+    for request_id in await get_unseen_request_ids(seen_ids):
+        request = await _fetch_request(request_id)
+        if request is None:
+            gone.append(request_id)
+        else:
+            changes.extend(await _apply_page([request]))
+    return changes, await delete_requests(gone)
+
+
+async def _sync(full: bool):
+    global _synced, _version
+    since = None if full else await get_sync_state(CURSOR_NAME)
+
+    high_water = since
+    seen_ids = []
+    changes = []
+    skip = 0
+    while True:
+        page = await _fetch_page(skip)
+        # Pages are most recently modified first, so stop once we reach known state
+        fresh = [r for r in page if not since or (r.get("updatedAt") or "") >= since]
+        changes.extend(await _apply_page(fresh))
+        seen_ids.extend(r["id"] for r in page if r.get("id") is not None)
+        for request in fresh:
+            updated_at = request.get("updatedAt")
+            if updated_at and (not high_water or updated_at > high_water):
+                high_water = updated_at
+
+        if len(fresh) < len(page) or len(page) < PAGE_SIZE:
+            break
+        skip += PAGE_SIZE
+
+    pruned = 0
+    if full:
+        confirmed, pruned = await _confirm_unseen(seen_ids)
+        changes.extend(confirmed)
+    # Only advance the cursor once the whole sweep has been stored
+    if high_water != since:
+        await set_sync_state(CURSOR_NAME, high_water)
+
+    if changes or pruned:
+        _version += 1
+        await _on_changes(changes)
+    _synced = True
+
+    if full:
+        logger.info(
+            f"Request mirror swept {len(seen_ids)} requests "
+            f"({len(changes)} changed, {pruned} removed)."
+        )
+    elif changes:
+        logger.info(f"Request mirror picked up {len(changes)} status changes.")
+    return changes
+
+
+async def sync_requests(full: bool = False) -> list[tuple[dict, tuple | None]]:
+    """
+    Mirrors Jellyseerr requests into the local requests table.
+    An incremental sync pages through requests by modification time and stops
+    at the stored high-water mark. A full sweep also removes requests that
+    Jellyseerr confirms were deleted.
+    Returns (request, previous (status, media_status)) pairs for every request
+    that is new or changed status; previous is None for new requests.
+    """
+    return await _sync_flight.do(full, lambda: _locked_sync(full))
+
+
+async def _locked_sync(full: bool):
+    async with _sync_lock:
+        return await _sync(full)
+
+
+def schedule_requests_sync():
+    """Starts an incremental sync in the background, e.g. after a new request."""
+    task = asyncio.create_task(sync_requests())
+    task.add_done_callback(_log_failure)
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and (e := task.exception()):
+        logger.warning(f"Background request sync failed: {e}")
+
+
+def mirror_version() -> int:
+    return _version
+
+
+async def ensure_synced():
+    """
+    Makes sure the mirror has been filled at least once, so /requests never
+    reads an empty table right after the bot first starts.
+    """
+    if not _synced and await get_sync_state(CURSOR_NAME) is None:
+        await sync_requests()
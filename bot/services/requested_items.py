@@ -0,0 +1,58 @@
+import logging
+
+from config import settings
+from bot.services.cache import TTLCache
+from bot.services.database import (
+    store_requested_items,
+    is_item_requested,
+    delete_requested_item,
+)
+
+logger = logging.getLogger(__name__)
+
+# Negative answers are only trusted briefly, since other clients can request too
+NEGATIVE_TTL_SECONDS = 60
+
+# Bounded in-memory layer in front of the requested_items table
+_membership = TTLCache(
+    max_size=settings.REQUESTED_ITEMS_CACHE_MAX_SIZE,
+    ttl=settings.CACHE_TTL_SECONDS,
+)
+
+
+def _key(media_type: str, tmdb_id) -> tuple[str, int]:
+    return (media_type, int(tmdb_id))
+
+
+async def is_requested(media_type: str, tmdb_id) -> bool:
+    """Returns whether the item has been requested by anyone on the server."""
+    if not media_type or not tmdb_id:
+        return False
+
+    key = _key(media_type, tmdb_id)
+    requested = _membership.get(key)
+    if requested is None:
+        requested = await is_item_requested(*key)
+        _membership.set(key, requested, ttl=None if requested else NEGATIVE_TTL_SECONDS)
+    return requested
+
+
+async def mark_requested(media_type: str, tmdb_id):
+    key = _key(media_type, tmdb_id)
+    _membership.set(key, True)
+    await store_requested_items([key])
+
+
+async def unmark_requested(media_type: str, tmdb_id):
+    key = _key(media_type, tmdb_id)
+    _membership.pop(key)
+    await delete_requested_item(*key)
+
+
+async def mark_requested_many(items: list[tuple[str, int]]):
+    """Marks several (media_type, tmdb_id) pairs as requested in one write."""
+    keys = [_key(media_type, tmdb_id) for media_type, tmdb_id in items]
+    for key in keys:
+        _membership.set(key, True)
+    if keys:
+        await store_requested_items(keys)
@@ -0,0 +1,23 @@
+import secrets
+
+from config import settings
+from bot.services.cache import TTLCache
+
+# Pagination sessions are referenced from callback_data by a short token, so
+# button payloads stay well under Telegram's 64-byte limit regardless of query
+_sessions = TTLCache(
+    max_size=settings.PAGINATION_SESSION_MAX_SIZE,
+    ttl=settings.PAGINATION_SESSION_TTL_SECONDS,
+)
+
+
+def create_pagination_session(results: list | dict) -> str:
+    """Stores paginated results and returns the token that refers to them."""
+    token = secrets.token_urlsafe(6)
+    _sessions.set(token, results)
+    return token
+
+
+def get_pagination_session(token: str) -> list | dict | None:
+    """Returns the results for `token`, or None if the session has expired."""
+    return _sessions.get(token)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import logging
+
+from bot.services.database import count_user_requests, get_user_request_payloads
+from bot.services.media_details import warm_media_details
+from bot.services.request_mirror import ensure_synced
+
+logger = logging.getLogger(__name__)
+
+# How many of a user's newest requests get their media details warmed
+WARM_REQUESTS = 20
+
+# Keeps running warm-ups referenced until they finish
+_warm_ups: set[asyncio.Task] = set()
+
+
+async def get_user_request_count(jellyseerr_user_id) -> int:
+    """
+    Counts a user's requests in the local mirror.
+    Raises the underlying httpx error if the mirror has never been filled and
+    Jellyseerr can't be reached.
+    """
+    await ensure_synced()
+    return await count_user_requests(int(jellyseerr_user_id))
+
+
+async def get_user_request(jellyseerr_user_id, index: int) -> dict | None:
+    """Returns the user's `index`-th request, newest first, from the local mirror."""
+    if index < 0:
+        return None
+    payloads = await get_user_request_payloads(
+        int(jellyseerr_user_id), limit=1, offset=index
+    )
+    return json.loads(payloads[0]) if payloads else None
+
+
+async def _warm_request_details(jellyseerr_user_id):
+    payloads = await get_user_request_payloads(
+        int(jellyseerr_user_id), limit=WARM_REQUESTS
+    )
+    media = [json.loads(payload).get("media") or {} for payload in payloads]
+    await warm_media_details([(m.get("mediaType"), m.get("tmdbId")) for m in media])
+
+
+def schedule_request_details_warm_up(jellyseerr_user_id):
+    """
+    Fetches media details for the user's newest requests in the background,
+    so paging through /requests doesn't wait on Jellyseerr card by card.
+    """
+    task = asyncio.create_task(_warm_request_details(jellyseerr_user_id))
+    _warm_ups.add(task)
+    task.add_done_callback(_warm_up_done)
+
+
+def _warm_up_done(task: asyncio.Task):
+    _warm_ups.discard(task)
+    if not task.cancelled() and (e := task.exception()):
+        logger.warning(f"Failed to warm request details: {e}")
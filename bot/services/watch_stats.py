@@ -0,0 +1,269 @@
+import asyncio
+import httpx
+import logging
+from datetime import datetime, timedelta
+
+from config import settings
+from bot.services.http_clients import (
+    BACKGROUND_TIMEOUT,
+    INTERACTIVE_TIMEOUT,
+    jellyfin_client,
+)
+from bot.services.cache import SingleFlight
+from bot.services.database import (
+    get_all_linked_users,
+    get_leaderboard,
+    get_leaderboard_rank,
+    get_watch_stats,
+    get_weekly_watch_ticks,
+    get_top_series,
+    store_watched_items,
+    get_unseen_watched_item_ids,
+    finish_watch_stats_refresh,
+    prune_watch_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+# Item IDs per lookup when confirming removals, to keep the URL short
+CONFIRM_BATCH_SIZE = 100
+TICKS_PER_SECOND = 10_000_000
+BREAKDOWN_WEEKS = 4
+TOP_SERIES = 3
+LEADERBOARD_SIZE = 10
+LEADERBOARD_PERIODS = ("week", "all")
+
+_refresh_flight = SingleFlight()
+
+
+async def _fetch_played_page(
+    jellyfin_user_id: str, start_index: int, timeout: httpx.Timeout
+) -> list[dict]:
+    """Fetches one page of a user's played movies and episodes, latest played first."""
+    params = {
+        "Recursive": "true",
+        "IncludeItemTypes": "Movie,Episode",
+        "Filters": "IsPlayed",
+        "SortBy": "DatePlayed,SortName",
+        "SortOrder": "Descending",
+        "StartIndex": start_index,
+        "Limit": PAGE_SIZE,
+        # Name, Type, SeriesName, RunTimeTicks and UserData are default fields,
+        # so no optional fields or image metadata are requested
+        "EnableImages": "false",
+        "EnableTotalRecordCount": "false",
+    }
+    response = await jellyfin_client.get(
+        f"/Users/{jellyfin_user_id}/Items", params=params, timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json().get("Items", [])
+
+
+async def _fetch_items(
+    jellyfin_user_id: str, item_ids: list[str], timeout: httpx.Timeout
+) -> list[dict]:
+    """Fetches specific items with the user's data, whether played or not."""
+    params = {
+        "Ids": ",".join(item_ids),
+        "EnableImages": "false",
+        "EnableTotalRecordCount": "false",
+    }
+    response = await jellyfin_client.get(
+        f"/Users/{jellyfin_user_id}/Items", params=params, timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json().get("Items", [])
+
+
+def _played_at(item: dict) -> str:
+    # Jellyfin reports UTC with 7 fractional digits; seconds are plenty here
+    return ((item.get("UserData") or {}).get("LastPlayedDate") or "")[:19]
+
+
+def _to_row(item: dict) -> tuple:
+    title = item.get("Name", "Unknown Title")
+    series_name = item.get("SeriesName") if item.get("Type") == "Episode" else None
+    if series_name:
+        title = f"{series_name} - {title}"
+    return (
+        item["Id"],
+        title,
+        series_name,
+        item.get("RunTimeTicks") or 0,
+        _played_at(item) or None,
+    )
+
+
+async def _confirm_unseen(
+    jellyfin_user_id: str, seen_ids: list[str], timeout: httpx.Timeout
+) -> list[str]:
+    """
+    Checks stored items that a full sweep didn't see. The sweep pages by
+    offset over play date, so an item played mid-sweep shifts the pages and
+    another can be skipped. Each one is looked up by ID; items still played
+    are stored again and the IDs of the rest (unplayed or deleted) returned.
+    """
+    unseen = await get_unseen_watched_item_ids(jellyfin_user_id, seen_ids)
+    gone = []
+    for start in range(0, len(unseen), CONFIRM_BATCH_SIZE):
+        batch = unseen[start : start + CONFIRM_BATCH_SIZE]
+        played = {
+            item["Id"]: item
+            for item in await _fetch_items(jellyfin_user_id, batch, timeout)
+            if (item.get("UserData") or {}).get("Played")
+        }
+        await store_watched_items(
+            jellyfin_user_id, [_to_row(item) for item in played.values()]
+        )
+        gone.extend(item_id for item_id in batch if item_id not in played)
+    return gone
+
+
+async def _refresh(jellyfin_user_id: str, full: bool, timeout: httpx.Timeout) -> bool:
+    stats = None if full else await get_watch_stats(jellyfin_user_id)
+    since = stats[4] if stats else None
+
+    high_water = since
+    seen_ids = []
+    start_index = 0
+    while True:
+        page = await _fetch_played_page(jellyfin_user_id, start_index, timeout)
+        # Latest played first, so stop once we reach items already folded in
+        fresh = [
+            item
+            for item in page
+            if item.get("Id") and (not since or _played_at(item) >= since)
+        ]
+        await store_watched_items(jellyfin_user_id, [_to_row(i) for i in fresh])
+        seen_ids.extend(item["Id"] for item in fresh)
+        for item in fresh:
+            if (played_at := _played_at(item)) and (
+                not high_water or played_at > high_water
+            ):
+                high_water = played_at
+
+        if len(fresh) < len(page) or len(page) < PAGE_SIZE:
+            break
+        start_index += PAGE_SIZE
+
+    gone = await _confirm_unseen(jellyfin_user_id, seen_ids, timeout) if full else []
+    await finish_watch_stats_refresh(
+        jellyfin_user_id, high_water, full=full, drop_item_ids=gone
+    )
+    return full
+
+
+async def refresh_watch_stats(
+    jellyfin_user_id: str,
+    full: bool = False,
+    timeout: httpx.Timeout = BACKGROUND_TIMEOUT,
+):
+    """
+    Updates a user's materialized watch stats. An incremental refresh only
+    asks Jellyfin for items played since the stored cursor; a full refresh
+    re-reads everything and drops items that were marked unplayed.
+    Raises the underlying httpx error if Jellyfin can't be reached.
+    """
+    jellyfin_user_id = str(jellyfin_user_id)
+    # One refresh per user at a time; a caller wanting a full refresh that
+    # joined an incremental one runs its own once that finishes
+    while True:
+        ran_full = await _refresh_flight.do(
+            jellyfin_user_id, lambda: _refresh(jellyfin_user_id, full, timeout)
+        )
+        if ran_full or not full:
+            return
+
+
+def _needs_full_refresh(stats) -> bool:
+    if not stats or not stats[6]:
+        return True
+    full_refreshed_at = datetime.fromisoformat(stats[6])
+    return datetime.utcnow() - full_refreshed_at >= timedelta(
+        seconds=settings.WATCH_STATS_FULL_REFRESH_SECONDS
+    )
+
+
+async def refresh_all_watch_stats():
+    """
+    Refreshes the watch stats of every linked user, at most
+    WATCH_STATS_CONCURRENCY at a time. Users whose last full refresh is older
+    than WATCH_STATS_FULL_REFRESH_SECONDS get a full one. Stats of users who
+    are no longer linked are dropped, so they leave the leaderboard.
+    """
+    semaphore = asyncio.Semaphore(settings.WATCH_STATS_CONCURRENCY)
+    jellyfin_user_ids = {row[4] for row in await get_all_linked_users() if row[4]}
+
+    async def refresh(jellyfin_user_id: str):
+        async with semaphore:
+            try:
+                stats = await get_watch_stats(jellyfin_user_id)
+                await refresh_watch_stats(
+                    jellyfin_user_id, full=_needs_full_refresh(stats)
+                )
+            except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                logger.warning(
+                    f"Failed to refresh watch stats for {jellyfin_user_id}: {e}"
+                )
+
+    await asyncio.gather(*(refresh(user_id) for user_id in jellyfin_user_ids))
+    pruned = await prune_watch_stats(list(jellyfin_user_ids))
+    logger.info(
+        f"Refreshed watch stats for {len(jellyfin_user_ids)} users"
+        f" (dropped {pruned} unlinked)."
+    )
+
+
+async def get_user_watch_stats(jellyfin_user_id: str) -> dict:
+    """
+    Returns a user's watch stats from the local tables, computing them first
+    if the background job hasn't reached this user yet.
+    Raises the underlying httpx error if that first computation fails.
+    """
+    jellyfin_user_id = str(jellyfin_user_id)
+    stats = await get_watch_stats(jellyfin_user_id)
+    if stats is None:
+        # Someone is waiting on this one, so it gets the interactive timeout
+        await refresh_watch_stats(
+            jellyfin_user_id, full=True, timeout=INTERACTIVE_TIMEOUT
+        )
+        stats = await get_watch_stats(jellyfin_user_id)
+
+    watched_count, total_ticks, last_played_title, _, _, refreshed_at, _ = stats
+    weekly = dict(await get_weekly_watch_ticks(jellyfin_user_id, BREAKDOWN_WEEKS))
+    return {
+        "watched_count": watched_count,
+        "total_seconds": total_ticks / TICKS_PER_SECOND,
+        "last_played_title": last_played_title,
+        "refreshed_at": refreshed_at,
+        "weekly_seconds": [
+            weekly.get(week, 0) / TICKS_PER_SECOND for week in range(BREAKDOWN_WEEKS)
+        ],
+        "top_series": [
+            (series_name, episodes, ticks / TICKS_PER_SECOND)
+            for series_name, episodes, ticks in await get_top_series(
+                jellyfin_user_id, TOP_SERIES
+            )
+        ],
+    }
+
+
+async def get_watch_leaderboard(period: str, jellyfin_user_id: str | None = None):
+    """
+    Returns the top LEADERBOARD_SIZE users for "week" (the last 7 days) or
+    "all", plus the caller's own standing if they have watch time in it.
+    Both come from the materialized watch_stats table.
+    """
+    top = [
+        (username or "Unknown", ticks / TICKS_PER_SECOND, count)
+        for _, username, ticks, count in await get_leaderboard(period, LEADERBOARD_SIZE)
+    ]
+    me = None
+    if jellyfin_user_id and (
+        row := await get_leaderboard_rank(period, str(jellyfin_user_id))
+    ):
+        rank, ticks, count = row
+        me = (rank, ticks / TICKS_PER_SECOND, count)
+    return {"top": top, "me": me}
@@ -0,0 +1,190 @@
+import asyncio
+import hmac
+import json
+import logging
+from pyrogram import Client
+
+from config import settings
+from bot.services.database import get_user_by_username, has_undeclined_request
+from bot.services.media_details import invalidate_media_details
+from bot.services.requested_items import mark_requested, unmark_requested
+from bot.services.request_mirror import schedule_requests_sync
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+# Time a client gets to send its headers, and then its body
+READ_TIMEOUT_SECONDS = 10
+
+REQUESTED_EVENTS = {
+    "MEDIA_PENDING",
+    "MEDIA_APPROVED",
+    "MEDIA_AUTO_APPROVED",
+    "MEDIA_AVAILABLE",
+}
+
+_server: asyncio.AbstractServer | None = None
+# Keeps running event handlers referenced until they finish
+_event_tasks: set[asyncio.Task] = set()
+
+
+async def _find_requester(request: dict) -> str | None:
+    """Maps the requester in a webhook payload to a linked Telegram ID."""
+    if username := request.get("requestedBy_username"):
+        linked_user = await get_user_by_username(username)
+        if linked_user:
+            return linked_user[0]
+    return request.get("requestedBy_settings_telegramChatId") or None
+
+
+async def handle_jellyseerr_event(client: Client, payload: dict):
+    """
+    Applies one Jellyseerr webhook notification: invalidates the caches it
+    affects, pulls the change into the request mirror, updates requested-item
+    state and DMs the requester when their media becomes available.
+    """
+    event = payload.get("notification_type", "")
+    media = payload.get("media") or {}
+    request = payload.get("request") or {}
+    media_type = media.get("media_type")
+    tmdb_id = media.get("tmdbId")
+
+    logger.info(f"Received Jellyseerr webhook: {event} ({media_type} {tmdb_id})")
+    if not media_type or not tmdb_id:
+        return
+
+    invalidate_media_details(media_type, tmdb_id)
+    schedule_requests_sync()
+    if event in REQUESTED_EVENTS:
+        await mark_requested(media_type, tmdb_id)
+    elif event == "MEDIA_DECLINED" and not await has_undeclined_request(
+        media_type, int(tmdb_id)
+    ):
+        # Another user's request for the same title keeps it marked. If the
+        # mirror hasn't seen this decline yet, the sync above unmarks it.
+        await unmark_requested(media_type, tmdb_id)
+
+    if event != "MEDIA_AVAILABLE":
+        return
+    telegram_id = await _find_requester(request)
+    if not telegram_id:
+        return
+
+    subject = payload.get("subject") or "Your requested media"
+    try:
+        await client.send_message(
+            chat_id=int(telegram_id),
+            text=f"🎬 {subject} is now available to watch!",
+        )
+    except Exception as e:
+        logger.warning(f"Could not DM user {telegram_id} about availability: {e}")
+
+
+def _authorized(headers: dict) -> bool:
+    # Compared as bytes: header values are latin-1 decoded and may hold
+    # non-ASCII characters, which compare_digest rejects in a str
+    return hmac.compare_digest(
+        headers.get("authorization", "").encode("latin-1"),
+        settings.WEBHOOK_SECRET.encode(),
+    )
+
+
+async def _respond(writer: asyncio.StreamWriter, status: str):
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple[str, str, dict]:
+    """Reads the request line and headers of an HTTP request."""
+    request_line = await reader.readline()
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method, path, headers
+
+
+async def _handle_connection(
+    client: Client, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    try:
+        async with asyncio.timeout(READ_TIMEOUT_SECONDS):
+            method, path, headers = await _read_head(reader)
+
+        if method != "POST" or path != settings.WEBHOOK_PATH:
+            await _respond(writer, "404 Not Found")
+            return
+        if not _authorized(headers):
+            await _respond(writer, "401 Unauthorized")
+            return
+
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            await _respond(writer, "413 Payload Too Large")
+            return
+        async with asyncio.timeout(READ_TIMEOUT_SECONDS):
+            body = await reader.readexactly(length)
+        payload = json.loads(body)
+        if not isinstance(payload, dict):
+            raise ValueError(f"expected a JSON object, got {type(payload).__name__}")
+
+        # Acknowledge first so Jellyseerr never waits on Telegram or the DB
+        await _respond(writer, "204 No Content")
+        task = asyncio.create_task(handle_jellyseerr_event(client, payload))
+        _event_tasks.add(task)
+        task.add_done_callback(_event_done)
+    except (ValueError, asyncio.IncompleteReadError) as e:
+        logger.warning(f"Rejected malformed webhook request: {e}")
+        await _respond(writer, "400 Bad Request")
+    except TimeoutError:
+        logger.warning("Dropped a webhook request that was too slow to arrive.")
+        await _respond(writer, "408 Request Timeout")
+    except Exception as e:
+        logger.error(f"Error handling webhook request: {e}")
+    finally:
+        writer.close()
+
+
+def _event_done(task: asyncio.Task):
+    _event_tasks.discard(task)
+    if not task.cancelled() and (e := task.exception()):
+        logger.error(f"Error handling Jellyseerr webhook event: {e}", exc_info=e)
+
+
+async def start_webhook_server(client: Client):
+    """
+    Starts the local Jellyseerr webhook receiver if it is enabled.
+    Refuses to start without WEBHOOK_SECRET, since anyone who can reach the
+    port could otherwise forge notifications.
+    """
+    global _server
+    if not settings.WEBHOOK_ENABLED:
+        return
+    if not settings.WEBHOOK_SECRET:
+        logger.error(
+            "WEBHOOK_ENABLED is set but WEBHOOK_SECRET is empty. "
+            "The Jellyseerr webhook receiver was not started."
+        )
+        return
+
+    _server = await asyncio.start_server(
+        lambda r, w: _handle_connection(client, r, w),
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+    )
+    logger.info(
+        f"Jellyseerr webhook listening on "
+        f"{settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}"
+    )
+
+
+async def stop_webhook_server():
+    global _server
+    if _server:
+        _server.close()
+        await _server.wait_closed()
+        _server = None
@@ -1,2 +0,0 @@
-# Shared state for tracking requested items
-requested_items = set()  # Set of (media_type, tmdb_id) tuples
@@ -19,6 +19,81 @@ class Config(BaseSettings):
     # Path to the database (defaults to the root folder)
     DB_PATH: str = "jellyseerr_bot.db"
 
+    # In-memory cache settings for search/discover results
+    CACHE_TTL_SECONDS: int = 3600
+    SEARCH_CACHE_MAX_SIZE: int = 500
+
+    # Server-side sessions backing the media pagination buttons
+    PAGINATION_SESSION_TTL_SECONDS: int = 86400
+    PAGINATION_SESSION_MAX_SIZE: int = 5000
+
+    # Local mirror of Jellyseerr requests backing /requests: an incremental
+    # sync by modification time, plus a periodic full sweep to drop deletions
+    REQUESTS_SYNC_INTERVAL_SECONDS: int = 60
+    REQUESTS_FULL_SYNC_INTERVAL_SECONDS: int = 6 * 3600
+
+    # In-memory layer in front of the requested_items table
+    REQUESTED_ITEMS_CACHE_MAX_SIZE: int = 10000
+
+    # Write-through cache of linked users, keyed by Telegram ID
+    LINKED_USER_CACHE_MAX_SIZE: int = 5000
+
+    # Shared cache of Jellyseerr movie/TV details
+    MEDIA_DETAILS_CACHE_TTL_SECONDS: int = 6 * 3600
+    MEDIA_DETAILS_CACHE_MAX_SIZE: int = 5000
+
+    # Max concurrent background renders of neighbouring pagination cards
+    PREFETCH_CONCURRENCY: int = 4
+
+    # Background refresh of the /discover feed
+    DISCOVER_REFRESH_INTERVAL_SECONDS: int = 3600
+    DISCOVER_PAGES: int = 1
+
+    # Background refresh of the materialized /watch statistics. Refreshes are
+    # incremental; each user gets a full one every WATCH_STATS_FULL_REFRESH_SECONDS
+    WATCH_STATS_REFRESH_SECONDS: int = 900
+    WATCH_STATS_FULL_REFRESH_SECONDS: int = 24 * 3600
+    WATCH_STATS_CONCURRENCY: int = 4
+
+    # Per-upstream HTTP connection pools. Idle connections are kept open this
+    # long so warm-up and bursts reuse them; HTTP/2 needs `pip install httpx[http2]`
+    JELLYSEERR_MAX_CONNECTIONS: int = 20
+    JELLYFIN_MAX_CONNECTIONS: int = 10
+    TMDB_MAX_CONNECTIONS: int = 5
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP2_ENABLED: bool = False
+
+    # Incremental refresh interval of the Jellyseerr user directory, and how
+    # often it is fully rebuilt to drop users deleted on Jellyseerr
+    USER_DIRECTORY_REFRESH_SECONDS: int = 300
+    USER_DIRECTORY_FULL_REFRESH_SECONDS: int = 24 * 3600
+
+    # How long the indexed snapshot of Jellyfin's /Users is reused
+    JELLYFIN_USERS_TTL_SECONDS: int = 60
+
+    # Number of async workers processing queued invites
+    PROVISIONING_WORKERS: int = 3
+    # Max time to wait for a user to appear in Jellyseerr after a failed import
+    JELLYSEERR_IMPORT_TIMEOUT_SECONDS: float = 15.0
+
+    # Expired-user cleanup: concurrency, per-upstream requests per second, and
+    # exponential backoff for users whose deletion failed
+    EXPIRY_CONCURRENCY: int = 5
+    EXPIRY_JELLYFIN_RATE: float = 5.0
+    EXPIRY_JELLYSEERR_RATE: float = 5.0
+    EXPIRY_TELEGRAM_RATE: float = 20.0
+    EXPIRY_RETRY_SECONDS: int = 60
+    EXPIRY_RETRY_MAX_SECONDS: int = 6 * 3600
+
+    # Optional local receiver for Jellyseerr webhook notifications.
+    # Only listens on localhost by default; set WEBHOOK_HOST=0.0.0.0 if
+    # Jellyseerr runs on another host. WEBHOOK_SECRET is required.
+    WEBHOOK_ENABLED: bool = False
+    WEBHOOK_HOST: str = "127.0.0.1"
+    WEBHOOK_PORT: int = 8085
+    WEBHOOK_PATH: str = "/jellyseerr"
+    WEBHOOK_SECRET: str | None = None
+
     # Admin User IDs
     ADMIN_USER_IDS: list[int]
 
@@ -7,9 +7,20 @@ from pyrogram.types import BotCommandScopeChat
 from config import settings
 from bot import app
 from bot.services import database
-from bot.services.http_clients import close_http_client
+from bot.services.http_clients import close_http_clients, warm_up_http_clients
+from bot.services.provisioning import (
+    start_provisioning_workers,
+    stop_provisioning_workers,
+)
+from bot.services.webhook import start_webhook_server, stop_webhook_server
 from bot.handlers import load_all_handlers
-from tasks import check_expired_users_task
+from tasks import (
+    check_expired_users_task,
+    refresh_discover_task,
+    refresh_user_directory_task,
+    sync_requests_task,
+    refresh_watch_stats_task,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -24,6 +35,7 @@ USER_COMMANDS = [
     BotCommand("discover", "Discover popular and trending media"),
     BotCommand("requests", "View your pending media requests"),
     BotCommand("watch", "See your personal watch statistics"),
+    BotCommand("leaderboard", "Top watchers. Usage: /leaderboard [week|all]"),
     BotCommand("link", "Link your Jellyfin account. Usage: /link <user> <pass>"),
     BotCommand("unlink", "Unlink your Jellyfin account"),
 ]
@@ -32,8 +44,9 @@ ADMIN_COMMANDS = USER_COMMANDS + [
     BotCommand("invite", "Reply to a user to create a permanent account"),
     BotCommand("trial", "Reply to a user to create a 7-day trial"),
     BotCommand("vip", "Reply to a user to create a 30-day VIP account"),
+    BotCommand("bulkinvite", "Queue invites. Usage: /bulkinvite [trial|vip] <ids>"),
     BotCommand("deleteuser", "Delete a user. Usage: /deleteuser <username>"),
-    BotCommand("listusers", "List all users on the Jellyfin server"),
+    BotCommand("listusers", "List users. Usage: /listusers [expiring <days>]"),
 ]
 
 
@@ -59,17 +72,29 @@ async def start_services(client: Client):
         logger.error(f"Failed to set bot commands: {e}")
 
     await database.init_db()
+    await warm_up_http_clients()
+
+    await start_webhook_server(client)
+    await start_provisioning_workers(client)
 
+    asyncio.create_task(sync_requests_task())
     asyncio.create_task(check_expired_users_task(client))
-    logger.info("Background task created. Bot is ready!")
+    asyncio.create_task(refresh_discover_task())
+    asyncio.create_task(refresh_user_directory_task())
+    asyncio.create_task(refresh_watch_stats_task())
+    logger.info("Background tasks created. Bot is ready!")
 
 
 @app.on_stop()
 async def stop_services(client: Client):
     """Async tasks to run *before* Pyrogram disconnects."""
     logger.info("Running shutdown services...")
-    await close_http_client()
-    logger.info("HTTP client closed.")
+    await stop_webhook_server()
+    await stop_provisioning_workers()
+    await close_http_clients()
+    logger.info("HTTP clients closed.")
+    await database.close_db()
+    logger.info("Database connections closed.")
 
 
 if __name__ == "__main__":
@@ -1,98 +1,231 @@
 import asyncio
 import httpx
 import logging
-from datetime import datetime
+import random
+import time
+from datetime import datetime, timedelta
 from pyrogram import Client
 
 from config import settings
 
-from bot.services.database import get_all_expiring_users, delete_linked_user
-
-from bot.services.http_clients import http_client, jellyfin_headers, jellyseerr_headers
+from bot.services.database import (
+    get_due_expiring_users,
+    get_next_expiry,
+    delete_linked_user,
+)
+from bot.services.expiry import begin_pass, sleep_until
+from bot.services.discover import refresh_discover_feed
+from bot.services.request_mirror import sync_requests
+from bot.services.watch_stats import refresh_all_watch_stats
+from bot.services.jellyfin_users import invalidate_jellyfin_users
+from bot.services.jellyseerr_users import refresh_user_directory, forget_user
+
+from bot.helpers.ratelimit import RateLimiter
+from bot.services.http_clients import jellyfin_client, jellyseerr_client
 
 logger = logging.getLogger(__name__)
 
 
+jellyfin_limiter = RateLimiter(settings.EXPIRY_JELLYFIN_RATE)
+jellyseerr_limiter = RateLimiter(settings.EXPIRY_JELLYSEERR_RATE)
+telegram_limiter = RateLimiter(settings.EXPIRY_TELEGRAM_RATE)
+
+# telegram_id -> (failed attempts, next retry time) for users whose deletion failed
+_expiry_retries: dict[str, tuple[int, datetime]] = {}
+
+
+async def _expire_user(app: Client, user_row) -> bool:
+    """Deletes one expired user from every service. Returns True on success."""
+    try:
+        telegram_id, jellyseerr_user_id, jellyfin_user_id, _ = user_row
+    except ValueError:
+        logger.error(f"Error unpacking user row: {user_row}")
+        return False
+
+    logger.info(f"User {telegram_id} has expired. Deleting...")
+    try:
+        # 404s are accepted so a retry after a partial failure can finish the job
+        async with jellyfin_limiter:
+            jf_res = await jellyfin_client.delete(
+                f"/Users/{jellyfin_user_id}", timeout=10
+            )
+        if jf_res.status_code != 404:
+            jf_res.raise_for_status()
+        invalidate_jellyfin_users()
+        logger.info(f"Deleted Jellyfin user: {jellyfin_user_id}")
+
+        async with jellyseerr_limiter:
+            js_res = await jellyseerr_client.delete(
+                f"/api/v1/user/{jellyseerr_user_id}", timeout=10
+            )
+        if js_res.status_code != 404:
+            js_res.raise_for_status()
+        forget_user(jellyseerr_user_id)
+        logger.info(f"Deleted Jellyseerr user: {jellyseerr_user_id}")
+
+        try:
+            async with telegram_limiter:
+                await app.send_message(
+                    chat_id=int(telegram_id),
+                    text="Your temporary access to the media server has expired and your account has been deleted.",
+                )
+            logger.info(f"Notified user {telegram_id} of expiration.")
+        except Exception as e:
+            logger.warning(f"Could not DM user {telegram_id} about expiration: {e}")
+
+        # --- 4. Cleanup DB ---
+        await delete_linked_user(telegram_id)
+        logger.info(f"Unlinked expired user from bot database: {telegram_id}")
+        return True
+
+    except httpx.RequestError as e:
+        logger.error(f"Failed to delete expired user {telegram_id} via API: {e}")
+    except Exception as e:
+        logger.error(
+            f"An unexpected error occurred while processing expiration for user {telegram_id}: {e}"
+        )
+    return False
+
+
+def _schedule_retry(telegram_id: str):
+    attempts = _expiry_retries.get(telegram_id, (0, None))[0] + 1
+    backoff = min(
+        settings.EXPIRY_RETRY_SECONDS * 2 ** (attempts - 1),
+        settings.EXPIRY_RETRY_MAX_SECONDS,
+    )
+    retry_at = datetime.utcnow() + timedelta(seconds=backoff * random.uniform(0.5, 1.0))
+    _expiry_retries[telegram_id] = (attempts, retry_at)
+    logger.info(
+        f"Will retry expiring user {telegram_id} at {retry_at.isoformat()} (attempt {attempts})."
+    )
+
+
+async def _process_expired_users(app: Client, due_users):
+    """Expires due users concurrently, bounded by EXPIRY_CONCURRENCY."""
+    semaphore = asyncio.Semaphore(settings.EXPIRY_CONCURRENCY)
+
+    async def process(user_row):
+        telegram_id = str(user_row[0])
+        async with semaphore:
+            expired = await _expire_user(app, user_row)
+        if expired:
+            _expiry_retries.pop(telegram_id, None)
+        else:
+            _schedule_retry(telegram_id)
+
+    await asyncio.gather(*(process(user_row) for user_row in due_users))
+
+
 async def check_expired_users_task(app: Client):
     """
-    A background task that runs once daily to check for and DELETE expired users.
+    A background task that deletes expired users as their deadlines arrive.
+    It sleeps until the earliest expiry or retry and is woken early whenever
+    an earlier deadline is stored.
     """
     while not app.is_connected:
         await asyncio.sleep(1)
 
-    logger.info("Starting daily check for expired users...")
+    logger.info("Starting expiry scheduler...")
 
     while True:
+        begin_pass()
         now = datetime.utcnow()
-        jellyfin_url = settings.JELLYFIN_URL
-        jellyseerr_url = settings.JELLYSEERR_URL
-
-        expiring_users = await get_all_expiring_users()
-        logger.info(f"Checking {len(expiring_users)} users for expiration.")
 
-        for user_row in expiring_users:
+        expired_rows = await get_due_expiring_users(now)
+
+        # Forget retries for users that were removed some other way
+        expired_ids = {str(row[0]) for row in expired_rows}
+        for telegram_id in set(_expiry_retries) - expired_ids:
+            del _expiry_retries[telegram_id]
+
+        due_users = [
+            row
+            for row in expired_rows
+            if str(row[0]) not in _expiry_retries
+            or _expiry_retries[str(row[0])][1] <= now
+        ]
+        if due_users:
+            logger.info(f"Processing {len(due_users)} expired users.")
+            await _process_expired_users(app, due_users)
+
+        deadlines = [retry_at for _, retry_at in _expiry_retries.values()]
+        if next_expiry := await get_next_expiry(after=now):
             try:
-                telegram_id, jellyseerr_user_id, jellyfin_user_id, expires_at_str = (
-                    user_row
-                )
+                deadlines.append(datetime.fromisoformat(next_expiry))
             except ValueError:
-                logger.error(f"Error unpacking user row: {user_row}")
-                continue
+                logger.error(f"Invalid expires_at format in database: {next_expiry}")
 
-            if not expires_at_str:
-                continue
+        await sleep_until(min(deadlines) if deadlines else None)
 
-            try:
-                expires_at = datetime.fromisoformat(expires_at_str)
-            except ValueError:
-                logger.error(
-                    f"Invalid expires_at format for user {telegram_id}: {expires_at_str}"
-                )
-                continue
-
-            if now >= expires_at:
-                logger.info(f"User {telegram_id} has expired. Deleting...")
-                try:
-                    jf_del_url = f"{jellyfin_url}/Users/{jellyfin_user_id}"
-                    jf_res = await http_client.delete(
-                        jf_del_url, headers=jellyfin_headers, timeout=10
-                    )
-                    jf_res.raise_for_status()
-                    logger.info(f"Deleted Jellyfin user: {jellyfin_user_id}")
-
-                    js_del_url = f"{jellyseerr_url}/api/v1/user/{jellyseerr_user_id}"
-                    js_res = await http_client.delete(
-                        js_del_url, headers=jellyseerr_headers, timeout=10
-                    )
-                    if js_res.status_code != 404:
-                        js_res.raise_for_status()
-                    logger.info(f"Deleted Jellyseerr user: {jellyseerr_user_id}")
-
-                    try:
-                        await app.send_message(
-                            chat_id=int(telegram_id),
-                            text="Your temporary access to the media server has expired and your account has been deleted.",
-                        )
-                        logger.info(f"Notified user {telegram_id} of expiration.")
-                    except Exception as e:
-                        logger.warning(
-                            f"Could not DM user {telegram_id} about expiration: {e}"
-                        )
-
-                    # --- 4. Cleanup DB ---
-                    await delete_linked_user(telegram_id)
-                    logger.info(
-                        f"Unlinked expired user from bot database: {telegram_id}"
-                    )
-
-                except httpx.RequestError as e:
-                    logger.error(
-                        f"Failed to delete expired user {telegram_id} via API: {e}"
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"An unexpected error occurred while processing expiration for user {telegram_id}: {e}"
-                    )
-
-        # Wait for 24 hours
-        await asyncio.sleep(60 * 60 * 24)
+
+async def refresh_discover_task():
+    """
+    A background task that keeps the /discover feed warm so users never wait on it.
+    """
+    while True:
+        try:
+            await refresh_discover_feed()
+        except Exception as e:
+            logger.error(f"Failed to refresh discover feed: {e}")
+        await asyncio.sleep(settings.DISCOVER_REFRESH_INTERVAL_SECONDS)
+
+
+async def refresh_user_directory_task():
+    """
+    A background task that keeps the Jellyseerr user directory in sync.
+    The first pass indexes every user; later passes only fetch recent updates,
+    with a full rebuild every USER_DIRECTORY_FULL_REFRESH_SECONDS.
+    """
+    last_full_refresh = None
+    while True:
+        now = time.monotonic()
+        full = (
+            last_full_refresh is None
+            or now - last_full_refresh >= settings.USER_DIRECTORY_FULL_REFRESH_SECONDS
+        )
+        try:
+            await refresh_user_directory(full=full)
+            if full:
+                last_full_refresh = now
+        except (httpx.HTTPStatusError, httpx.RequestError) as e:
+            logger.error(f"Failed to refresh Jellyseerr user directory: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error while refreshing user directory: {e}")
+        await asyncio.sleep(settings.USER_DIRECTORY_REFRESH_SECONDS)
+
+
+async def sync_requests_task():
+    """
+    A background task that keeps the local request mirror up to date.
+    It starts with a full sweep, then only pulls recently modified requests,
+    with another full sweep every REQUESTS_FULL_SYNC_INTERVAL_SECONDS.
+    """
+    last_full_sync = None
+    while True:
+        now = time.monotonic()
+        full = (
+            last_full_sync is None
+            or now - last_full_sync >= settings.REQUESTS_FULL_SYNC_INTERVAL_SECONDS
+        )
+        try:
+            await sync_requests(full=full)
+            if full:
+                last_full_sync = now
+        except (httpx.HTTPStatusError, httpx.RequestError) as e:
+            logger.error(f"Failed to sync requests from Jellyseerr: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error while syncing requests: {e}")
+        await asyncio.sleep(settings.REQUESTS_SYNC_INTERVAL_SECONDS)
+
+
+async def refresh_watch_stats_task():
+    """
+    A background task that keeps every linked user's /watch statistics
+    materialized, asking Jellyfin only for items played since the last run.
+    """
+    while True:
+        try:
+            await refresh_all_watch_stats()
+        except Exception as e:
+            logger.error(f"Failed to refresh watch stats: {e}")
+        await asyncio.sleep(settings.WATCH_STATS_REFRESH_SECONDS)